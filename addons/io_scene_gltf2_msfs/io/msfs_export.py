@@ -23,6 +23,8 @@ from .. import get_version_string
 from .msfs_light import MSFSLight
 from .msfs_gizmo import MSFSGizmo
 from .msfs_material import MSFSMaterial
+from .msfs_multi_export_profiler import MSFS_ExportProfiler
+from .msfs_multi_export_budgets import MSFS_ExportBudgets
 
 class Export:
     
@@ -40,22 +42,28 @@ class Export:
 
     def gather_gltf_extensions_hook(self, gltf2_plan, export_settings):
         if self.properties.enabled:
-            for i, image in enumerate(gltf2_plan.images):
-                image.uri = os.path.basename(urllib.parse.unquote(image.uri))
+            with MSFS_ExportProfiler.phase("gather_gltf_extensions_hook"):
+                for i, image in enumerate(gltf2_plan.images):
+                    image.uri = os.path.basename(urllib.parse.unquote(image.uri))
+
+        # Only does anything during a multi-export of a LOD group with budgets
+        MSFS_ExportBudgets.check(gltf2_plan, export_settings)
 
     def gather_node_hook(self, gltf2_object, blender_object, export_settings):
         if self.properties.enabled:
+            with MSFS_ExportProfiler.phase("gather_node_hook"):
+                if gltf2_object.extensions is None:
+                    gltf2_object.extensions = {}
 
-            if gltf2_object.extensions is None:
-                gltf2_object.extensions = {}
-
-            if blender_object.type == 'LIGHT':
-                MSFSLight.export(gltf2_object, blender_object)
+                if blender_object.type == 'LIGHT':
+                    MSFSLight.export(gltf2_object, blender_object)
 
     def gather_scene_hook(self, gltf2_scene, blender_scene, export_settings):
         if self.properties.enabled:
-            MSFSGizmo.export(gltf2_scene.nodes, blender_scene, export_settings)
+            with MSFS_ExportProfiler.phase("gather_scene_hook"):
+                MSFSGizmo.export(gltf2_scene.nodes, blender_scene, export_settings)
 
     def gather_material_hook(self, gltf2_material, blender_material, export_settings):
         if self.properties.enabled:
-            MSFSMaterial.export(gltf2_material, blender_material, export_settings)
+            with MSFS_ExportProfiler.phase("gather_material_hook"):
+                MSFSMaterial.export(gltf2_material, blender_material, export_settings)
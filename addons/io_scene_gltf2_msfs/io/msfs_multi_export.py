@@ -17,9 +17,13 @@
 import os
 import re
 import bpy
+import time
 import uuid
-import xml.dom.minidom
-import xml.etree.ElementTree as etree
+
+from bpy.app.handlers import persistent
+from xml.sax.saxutils import quoteattr
+
+from .msfs_multi_export_journal import MSFS_MultiExportJournal
 
 
 # Scene Properties
@@ -33,165 +37,310 @@ class MSFSMultiExporterProperties:
     )
 
 
+class MultiExporterProgress(bpy.types.PropertyGroup):
+    name: bpy.props.StringProperty(name="", default="")
+    progress: bpy.props.FloatProperty(
+        name="", default=0.0, min=0.0, max=100.0, subtype="PERCENTAGE"
+    )
+
+
 # Operators
 class MSFS_OT_MultiExportGLTF2(bpy.types.Operator):
     bl_idname = "export_scene.multi_export_gltf"
     bl_label = "Multi-Export glTF 2.0"
 
+    queue = None  # The MultiExportQueue of the run in progress
+
+    resume: bpy.props.BoolProperty(
+        name="Resume",
+        description="Skip the files an interrupted export already finished, if they're still up to date",
+        default=False,
+        options={"HIDDEN", "SKIP_SAVE"},
+    )
+
     @staticmethod
-    def export(file_path):
-        settings = bpy.context.scene.msfs_multi_exporter_settings
+    def get_export_settings(settings):
+        return {
+            "export_copyright": settings.export_copyright,
+            "export_image_format": settings.export_image_format,
+            "export_texture_dir": settings.export_texture_dir,
+            "export_keep_originals": settings.export_keep_originals,
+            "export_texcoords": settings.export_texcoords,
+            "export_normals": settings.export_normals,
+            "export_tangents": settings.export_tangents,
+            "export_materials": settings.export_materials,
+            "export_colors": settings.export_colors,
+            "use_mesh_edges": settings.use_mesh_edges,
+            "use_mesh_vertices": settings.use_mesh_vertices,
+            "export_cameras": settings.export_cameras,
+            "use_visible": settings.use_visible,
+            "use_renderable": settings.use_renderable,
+            "use_active_collection": settings.use_active_collection,
+            "export_extras": settings.export_extras,
+            "export_yup": settings.export_yup,
+            "export_apply": settings.export_apply,
+            "export_animations": settings.export_animations,
+            "export_frame_range": settings.export_frame_range,
+            "export_frame_step": settings.export_frame_step,
+            "export_force_sampling": settings.export_force_sampling,
+            "export_nla_strips": settings.export_nla_strips,
+            "export_def_bones": settings.export_def_bones,
+            "export_current_frame": settings.export_current_frame,
+            "export_skins": settings.export_skins,
+            "export_all_influences": settings.export_all_influences,
+            "export_lights": settings.export_lights,
+            "export_displacement": settings.export_displacement,
+        }
+
+    @staticmethod
+    def export(file_path, export_settings=None):
+        if export_settings is None:
+            export_settings = MSFS_OT_MultiExportGLTF2.get_export_settings(
+                bpy.context.scene.msfs_multi_exporter_settings
+            )
 
         bpy.ops.export_scene.gltf(
             export_format="GLTF_SEPARATE",
             use_selection=True,
             filepath=file_path,
-            export_copyright=settings.export_copyright,
-            export_image_format=settings.export_image_format,
-            export_texture_dir=settings.export_texture_dir,
-            export_keep_originals=settings.export_keep_originals,
-            export_texcoords=settings.export_texcoords,
-            export_normals=settings.export_normals,
-            export_tangents=settings.export_tangents,
-            export_materials=settings.export_materials,
-            export_colors=settings.export_colors,
-            use_mesh_edges=settings.use_mesh_edges,
-            use_mesh_vertices=settings.use_mesh_vertices,
-            export_cameras=settings.export_cameras,
-            use_visible=settings.use_visible,
-            use_renderable=settings.use_renderable,
-            use_active_collection=settings.use_active_collection,
-            export_extras=settings.export_extras,
-            export_yup=settings.export_yup,
-            export_apply=settings.export_apply,
-            export_animations=settings.export_animations,
-            export_frame_range=settings.export_frame_range,
-            export_frame_step=settings.export_frame_step,
-            export_force_sampling=settings.export_force_sampling,
-            export_nla_strips=settings.export_nla_strips,
-            export_def_bones=settings.export_def_bones,
-            export_current_frame=settings.export_current_frame,
-            export_skins=settings.export_skins,
-            export_all_influences=settings.export_all_influences,
-            export_lights=settings.export_lights,
-            export_displacement=settings.export_displacement,
+            **export_settings,
+        )
+
+    @staticmethod
+    def read_guid(xml_path):
+        # The GUID is an attribute of the root element, so there's no need to parse the whole file
+        try:
+            with open(xml_path, "r", encoding="utf-8") as f:
+                match = re.search(r"<ModelInfo\b[^>]*\bguid=\"([^\"]*)\"", f.read(4096))
+        except (OSError, UnicodeDecodeError):
+            return None
+        return match.group(1) if match else None
+
+    @staticmethod
+    def get_guid(lod_group, xml_path):
+        # The GUID is kept on the LOD group, so an existing XML file only has to be read the first time
+        if lod_group.overwrite_guid or not lod_group.guid:
+            found_guid = None
+            if not lod_group.overwrite_guid:
+                found_guid = MSFS_OT_MultiExportGLTF2.read_guid(xml_path)
+            lod_group.guid = found_guid or "{" + str(uuid.uuid4()) + "}"
+        return lod_group.guid
+
+    @staticmethod
+    def generate_xml(context, lod_group):
+        """
+        Returns the path and contents of the ModelInfo XML of a LOD group, or None if it has no LODs to export
+        """
+        from .msfs_multi_export_objects import MSFS_LODGroupUtility
+
+        xml_path = bpy.path.abspath(
+            os.path.join(
+                lod_group.folder_name,
+                lod_group.group_name + ".xml",
+            )
+        )
+
+        lod_files = {}
+
+        for lod in lod_group.lods:
+            if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
+                continue
+
+            if lod.enabled:
+                lod_files[lod.file_name] = lod.lod_value
+
+        if not lod_files:
+            return None
+
+        guid = MSFS_OT_MultiExportGLTF2.get_guid(lod_group, xml_path)
+
+        lines = [
+            '<?xml version="1.0" encoding="utf-8"?>',
+            f'<ModelInfo guid={quoteattr(guid)} version="1.1">',
+            "\t<LODS>",
+        ]
+
+        for file_name, lod_value in sorted(lod_files.items()):
+            model_file = quoteattr(os.path.splitext(file_name)[0] + ".gltf")
+            lines.append(f'\t\t<LOD minSize="{lod_value}" ModelFile={model_file}/>')
+
+        lines += ["\t</LODS>", "</ModelInfo>", ""]
+
+        return xml_path, "\n".join(lines)
+
+    @staticmethod
+    def write_xml(xml_path, xml_string, only_if_changed=False):
+        if only_if_changed:
+            from .msfs_multi_export_staging import MSFS_StagedOutput
+
+            MSFS_StagedOutput.write_if_changed(xml_path, xml_string.encode("utf-8"))
+            return
+
+        with open(xml_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(xml_string)
+
+    @staticmethod
+    def create_queue(context, resume=False):
+        from .msfs_multi_export_jobs import MSFS_MultiExportJobs
+        from .msfs_multi_export_queue import MultiExportQueue
+
+        queue = MultiExportQueue(
+            context, MSFS_MultiExportJobs.gather(context), resume
         )
+        queue.generate_xml(context)
+        queue.start()
+        return queue
+
+    def report_results(self, queue):
+        results = queue.finish()
+
+        for line in queue.profile_summary + queue.balance_summary:
+            print(line)
+            self.report({"INFO"}, line)
+
+        for warning in queue.warnings:
+            self.report({"WARNING"}, warning)
+
+        failed = [result for result in results if not result.success]
+        for result in failed:
+            self.report({"ERROR"}, f"Failed to export {result.file_path}: {result.error}")
+        for result in results:
+            for warning in result.warnings:
+                self.report({"WARNING"}, f"{result.file_path}: {warning}")
+
+        if queue.cancelled:
+            self.report({"WARNING"}, f"Export cancelled, exported {len(results) - len(failed)} of {len(queue.jobs)} files")
+            return {"CANCELLED"}
+
+        if failed:
+            self.report({"WARNING"}, f"Exported {len(results) - len(failed)} of {len(results)} files")
+            return {"CANCELLED"}
+
+        message = f"Exported {len(results)} files"
+        if queue.resumed:
+            message += f", {len(queue.resumed)} already exported by the interrupted run"
+        if queue.skipped:
+            message += f", skipped {len(queue.skipped)} unchanged"
+        self.report({"INFO"}, message)
+        return {"FINISHED"}
+
+    @classmethod
+    def poll(cls, context):
+        from .msfs_multi_export_watch import MSFS_ExportWatcher
+
+        return MSFS_OT_MultiExportGLTF2.queue is None and MSFS_ExportWatcher.queue is None
 
     def execute(self, context):
-        if context.scene.msfs_multi_exporter_current_tab == "OBJECTS":
-            from .msfs_multi_export_objects import MSFS_LODGroupUtility
-
-            lod_groups = context.scene.msfs_multi_exporter_lod_groups
-            sort_by_collection = context.scene.multi_exporter_grouped_by_collections
-
-            for lod_group in lod_groups:
-                # Generate XML if needed
-                if lod_group.generate_xml:
-                    xml_path = bpy.path.abspath(
-                        os.path.join(
-                            lod_group.folder_name,
-                            lod_group.group_name + ".xml",
-                        )
-                    )
-
-                    found_guid = None
-                    if os.path.exists(xml_path):
-                        tree = etree.parse(xml_path)
-                        found_guid = tree.getroot().attrib.get("guid")
-
-                    if lod_group.overwrite_guid or found_guid is None:
-                        root = etree.Element(
-                            "ModelInfo",
-                            guid="{" + str(uuid.uuid4()) + "}",
-                            version="1.1",
-                        )
-                    else:
-                        root = etree.Element(
-                            "ModelInfo", guid=found_guid, version="1.1"
-                        )
-
-                    lods = etree.SubElement(root, "LODS")
-
-                    lod_files = {}
-
-                    for lod in lod_group.lods:
-                        if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
-                            continue
-
-                        if lod.enabled:
-                            lod_files[lod.file_name] = lod.lod_value
-
-                    lod_files = sorted(lod_files.items())
-                    last_lod = list(lod_files)[-1:]
-
-                    for file_name, lod_value in lod_files:
-                        lod_element = etree.SubElement(lods, "LOD")
-
-                        if file_name != last_lod[0]:
-                            lod_element.set("minSize", str(lod_value))
-
-                        lod_element.set(
-                            "ModelFile", os.path.splitext(file_name)[0] + ".gltf"
-                        )
-
-                    if lod_files:
-                        # Format XML
-                        dom = xml.dom.minidom.parseString(etree.tostring(root))
-                        xml_string = dom.toprettyxml(encoding="utf-8")
-
-                        with open(
-                            xml_path,
-                            "wb",
-                        ) as f:
-                            f.write(xml_string)
-                            f.close()
-
-                # Export glTF
-                for lod in lod_group.lods:
-                    if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
-                        continue
-
-                    if lod.enabled:
-                        # Use selected objects in order to specify what to export
-                        for obj in bpy.context.selected_objects:
-                            obj.select_set(False)
-
-                        def select_recursive(obj):
-                            if obj in list(bpy.context.window.view_layer.objects):
-                                obj.select_set(True)
-                                for child in obj.children:
-                                    select_recursive(child)
-
-                        if sort_by_collection:
-                            for obj in lod.collection.all_objects:
-                                obj.select_set(True)
-                        else:
-                            select_recursive(lod.object)
-
-                        MSFS_OT_MultiExportGLTF2.export(
-                            os.path.join(
-                                bpy.path.abspath(lod_group.folder_name),
-                                os.path.splitext(lod.file_name)[0],
-                            )
-                        )
-
-        elif context.scene.msfs_multi_exporter_current_tab == "PRESETS":
-            presets = bpy.context.scene.msfs_multi_exporter_presets
-            for preset in presets:
-                if preset.enabled:
-                    # Clear currently selected objects
-                    for obj in bpy.context.selected_objects:
-                        obj.select_set(False)
-
-                    # Loop through all enabled layers and select all objects
-                    for layer in preset.layers:
-                        if layer.enabled:
-                            for obj in layer.collection.all_objects:
-                                if obj in list(bpy.context.window.view_layer.objects):
-                                    obj.select_set(True)
-
-                    MSFS_OT_MultiExportGLTF2.export(bpy.path.abspath(preset.file_path))
+        queue = self.create_queue(context, self.resume)
+        while not queue.done:
+            if queue.workers is not None:
+                time.sleep(0.1)
+            queue.step()
+
+        return self.report_results(queue)
+
+    def invoke(self, context, event):
+        MSFS_OT_MultiExportGLTF2.queue = self.create_queue(context, self.resume)
+
+        wm = context.window_manager
+        wm.progress_begin(0, max(len(MSFS_OT_MultiExportGLTF2.queue.jobs), 1))
+        self.timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+
+        MSFS_OT_MultiExportGLTF2.update_progress(context)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if event.type != "TIMER":
+            return {"PASS_THROUGH"}
+
+        queue = MSFS_OT_MultiExportGLTF2.queue
+        if queue is None:
+            # Aborted, like when another file was loaded
+            context.window_manager.event_timer_remove(self.timer)
+            return {"CANCELLED"}
+
+        try:
+            # Only one job is exported per timer event, so the UI gets to redraw and handle the cancel button in between
+            queue.step()
+        except Exception:
+            queue.cancel()
+            self.end_modal(context)
+            raise
+
+        MSFS_OT_MultiExportGLTF2.update_progress(context)
+        if not queue.done:
+            return {"PASS_THROUGH"}
+
+        self.end_modal(context)
+        return self.report_results(queue)
+
+    def cancel(self, context):
+        # The modal handler was removed without finishing, like when the window is closed
+        MSFS_OT_MultiExportGLTF2.abort()
+        try:
+            context.window_manager.event_timer_remove(self.timer)
+        except Exception:
+            pass
+
+    @staticmethod
+    def abort():
+        queue = MSFS_OT_MultiExportGLTF2.queue
+        if queue is None:
+            return
+
+        MSFS_OT_MultiExportGLTF2.queue = None
+        queue.abort()
+
+        wm = bpy.context.window_manager
+        if wm is not None:
+            wm.progress_end()
+            wm.msfs_multi_exporter_progress.clear()
+
+    def end_modal(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        wm.msfs_multi_exporter_progress.clear()
+        MSFS_OT_MultiExportGLTF2.queue = None
+
+        for area in context.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+    @staticmethod
+    def update_progress(context):
+        queue = MSFS_OT_MultiExportGLTF2.queue
+
+        wm = context.window_manager
+        wm.progress_update(len(queue.results))
+
+        progress = queue.get_progress()
+        if len(wm.msfs_multi_exporter_progress) != len(progress):
+            wm.msfs_multi_exporter_progress.clear()
+            for _ in progress:
+                wm.msfs_multi_exporter_progress.add()
+
+        for item, (group_name, done, total) in zip(wm.msfs_multi_exporter_progress, progress):
+            item.name = f"{group_name} ({done}/{total})"
+            item.progress = done / total * 100
+
+        for area in context.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
 
+class MSFS_OT_CancelMultiExport(bpy.types.Operator):
+    bl_idname = "msfs.multi_export_cancel"
+    bl_label = "Cancel Multi-Export"
+    bl_description = "Stop the multi-export after the files that are currently being exported"
+
+    @classmethod
+    def poll(cls, context):
+        return MSFS_OT_MultiExportGLTF2.queue is not None
+
+    def execute(self, context):
+        MSFS_OT_MultiExportGLTF2.queue.cancel()
         return {"FINISHED"}
 
 
@@ -241,6 +390,30 @@ class MSFS_PT_MultiExporter(bpy.types.Panel):
             depress=(current_tab == "SETTINGS"),
         ).current_tab = "SETTINGS"
 
+        queue = MSFS_OT_MultiExportGLTF2.queue
+        if queue is not None:
+            box = layout.box()
+
+            eta = queue.get_eta()
+            if eta is None:
+                box.label(text=f"Exporting {len(queue.results)} of {len(queue.jobs)} files")
+            else:
+                minutes, seconds = divmod(int(eta), 60)
+                box.label(text=f"Exporting {len(queue.results)} of {len(queue.jobs)} files, {minutes}:{seconds:02d} remaining")
+
+            col = box.column()
+            col.enabled = False
+            for item in context.window_manager.msfs_multi_exporter_progress:
+                col.prop(item, "progress", text=item.name, slider=True)
+
+            box.operator(MSFS_OT_CancelMultiExport.bl_idname, text="Cancel", icon="CANCEL")
+        elif MSFS_MultiExportJournal.exists():
+            box = layout.box()
+            box.label(text="The last multi-export didn't complete", icon="INFO")
+            box.operator(
+                MSFS_OT_MultiExportGLTF2.bl_idname, text="Resume", icon="PLAY"
+            ).resume = True
+
 
 def register_panel():
     # Register the panel on demand, we need to be sure to only register it once
@@ -261,3 +434,23 @@ def unregister_panel():
         bpy.utils.unregister_class(MSFS_PT_MultiExporter)
     except Exception:
         pass
+
+
+@persistent
+def multi_export_load(*args):
+    # The objects of the export in progress belong to the file that was open before
+    MSFS_OT_MultiExportGLTF2.abort()
+
+
+def register():
+    bpy.types.WindowManager.msfs_multi_exporter_progress = bpy.props.CollectionProperty(
+        type=MultiExporterProgress
+    )
+    if multi_export_load not in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.append(multi_export_load)
+
+
+def unregister():
+    if multi_export_load in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.remove(multi_export_load)
+    MSFS_OT_MultiExportGLTF2.abort()
@@ -0,0 +1,229 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Runs the multi-export of many .blend files, each in its own background Blender process. Only the standard library is
+used, so this runs with any Python 3 as well as from Blender:
+
+    python msfs_multi_export_batch.py --blender path/to/blender "aircraft/**/*.blend" [options]
+    blender --background --python-expr "import io_scene_gltf2_msfs.io.msfs_multi_export_batch as batch; batch.main()" -- "aircraft/**/*.blend" [options]
+
+Options:
+    --manifest manifest.json    Manifest applied to every file (see msfs_multi_export_cli), files are exported as saved without one
+    --concurrency N             Number of files exported at the same time, defaults to 1
+    --stop-on-failure           Don't start any more files once one failed, files already running are finished
+    --resume                    Skip the files an interrupted run of each .blend already exported
+    --report report.json        Path to write the combined JSON report to
+
+Every file is exported by the msfs_multi_export_cli entry point, so the addon needs to be installed in the Blender that
+is used. The combined report is printed to stdout, and the process exits with 0 if every file exported and 1 otherwise.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+
+EXIT_SUCCESS = 0
+EXIT_FAILED = 1
+
+CLI_MODULE = "io_scene_gltf2_msfs.io.msfs_multi_export_cli"
+
+
+class MSFS_MultiExportBatch:
+    def __init__(
+        self,
+        blender_path,
+        blend_files,
+        manifest_path=None,
+        concurrency=1,
+        stop_on_failure=False,
+        resume=False,
+    ):
+        self.blender_path = blender_path
+        self.blend_files = blend_files
+        self.manifest_path = os.path.abspath(manifest_path) if manifest_path else None
+        self.concurrency = max(concurrency, 1)
+        self.stop_on_failure = stop_on_failure
+        self.resume = resume
+
+        self.log_dir = tempfile.mkdtemp(prefix="msfs_multi_export_batch_")
+        self.stopped = threading.Event()
+
+    @staticmethod
+    def find_blend_files(patterns):
+        blend_files = []
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+            for path in matches:
+                path = os.path.abspath(path)
+                if path.lower().endswith(".blend") and os.path.isfile(path) and path not in blend_files:
+                    blend_files.append(path)
+        return blend_files
+
+    def get_command(self, blend_file, summary_path):
+        command = [
+            self.blender_path,
+            "--background",
+            blend_file,
+            # Otherwise an exception in the CLI still ends Blender with exit code 0
+            "--python-exit-code",
+            str(EXIT_FAILED),
+            "--python-expr",
+            f"import importlib; importlib.import_module({CLI_MODULE!r}).main()",
+            "--",
+        ]
+        if self.manifest_path:
+            command.append(self.manifest_path)
+        command += ["--summary", summary_path]
+        if self.resume:
+            command.append("--resume")
+        return command
+
+    def export(self, index, blend_file):
+        name = f"{index:03d}_{os.path.splitext(os.path.basename(blend_file))[0]}"
+        summary_path = os.path.join(self.log_dir, name + ".summary.json")
+        log_path = os.path.join(self.log_dir, name + ".log")
+
+        report = {"blend_file": blend_file, "log": log_path}
+        if self.stopped.is_set():
+            report["exit_code"] = None
+            report["error"] = "Not run, an earlier file failed"
+            return report
+
+        start_time = time.perf_counter()
+        try:
+            with open(log_path, "w") as log:
+                report["exit_code"] = subprocess.run(
+                    self.get_command(blend_file, summary_path),
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                ).returncode
+        except OSError as e:
+            report["exit_code"] = EXIT_FAILED
+            report["error"] = f"Could not start Blender: {e}"
+        report["duration"] = time.perf_counter() - start_time
+
+        try:
+            with open(summary_path, "r") as f:
+                report["summary"] = json.load(f)
+        except (OSError, ValueError):
+            # Blender crashed or never got to the export
+            report.setdefault("error", f"No summary written, see {log_path}")
+            if report["exit_code"] == EXIT_SUCCESS:
+                report["exit_code"] = EXIT_FAILED
+
+        if report["exit_code"] != EXIT_SUCCESS:
+            print(f"Failed to export {blend_file} (exit code {report['exit_code']})", file=sys.stderr)
+            if self.stop_on_failure:
+                self.stopped.set()
+        else:
+            print(f"Exported {blend_file}", file=sys.stderr)
+
+        return report
+
+    def run(self):
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [
+                executor.submit(self.export, i, blend_file)
+                for i, blend_file in enumerate(self.blend_files)
+            ]
+            reports = [future.result() for future in futures]
+
+        totals = {"exported": 0, "failed": 0, "skipped": 0, "resumed": 0}
+        for report in reports:
+            for key in totals:
+                totals[key] += report.get("summary", {}).get(key, 0)
+
+        return {
+            "manifest": self.manifest_path,
+            "log_dir": self.log_dir,
+            "duration": time.perf_counter() - start_time,
+            "blend_files": len(reports),
+            "succeeded": sum(report["exit_code"] == EXIT_SUCCESS for report in reports),
+            "failed": sum(report["exit_code"] not in (EXIT_SUCCESS, None) for report in reports),
+            "not_run": sum(report["exit_code"] is None for report in reports),
+            "files": totals,
+            "reports": reports,
+        }
+
+
+def get_default_blender_path():
+    try:
+        import bpy
+
+        return bpy.app.binary_path
+    except ImportError:
+        return "blender"
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        prog="msfs_multi_export_batch",
+        description="Run the MSFS multi-exporter on many .blend files in background Blender processes",
+    )
+    parser.add_argument("blend_files", nargs="+", help=".blend files or glob patterns")
+    parser.add_argument("--blender", default=get_default_blender_path(), help="Path to the Blender executable")
+    parser.add_argument("--manifest", help="JSON or TOML manifest applied to every file")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of files exported at the same time")
+    parser.add_argument(
+        "--stop-on-failure",
+        action="store_true",
+        help="Don't start any more files once one failed",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the files an interrupted run already exported",
+    )
+    parser.add_argument("--report", help="Path to write the combined JSON report to")
+    args = parser.parse_args(argv)
+
+    blend_files = MSFS_MultiExportBatch.find_blend_files(args.blend_files)
+    if not blend_files:
+        parser.error("No .blend files found")
+
+    report = MSFS_MultiExportBatch(
+        args.blender,
+        blend_files,
+        args.manifest,
+        args.concurrency,
+        args.stop_on_failure,
+        args.resume,
+    ).run()
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=4)
+    print(json.dumps(report, indent=4))
+
+    exit_code = EXIT_SUCCESS if report["failed"] == 0 and report["not_run"] == 0 else EXIT_FAILED
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+from contextlib import contextmanager
+
+from .msfs_multi_export_staging import MSFS_StagedOutput
+
+
+class BudgetExceededError(Exception):
+    pass
+
+
+class MSFS_ExportBudgets:
+    """
+    Checks the triangles, vertices, draw calls, texture size and buffer size of an exported LOD against the budgets of
+    its LOD group. Everything is counted from the finished glTF plan, so no extra pass over the scene is needed
+    """
+
+    current = None  # The budgets of the export in progress, if any
+
+    # Usage key, label, unit
+    limits = (
+        ("triangles", "triangles", ""),
+        ("vertices", "vertices", ""),
+        ("draw_calls", "draw calls", ""),
+        ("texture_size", "texture size", " bytes"),
+        ("bin_size", ".bin size", " bytes"),
+    )
+
+    def __init__(self):
+        self.usage = None
+        self.violations = []
+
+    @staticmethod
+    def resolve(items, reference):
+        # The exporter replaces references with indices while it builds the file
+        return items[reference] if isinstance(reference, int) else reference
+
+    @staticmethod
+    def get_usage(gltf2_plan, export_settings):
+        usage = {"triangles": 0, "vertices": 0, "draw_calls": 0, "texture_size": 0, "bin_size": 0}
+
+        meshes = gltf2_plan.meshes or []
+        accessors = gltf2_plan.accessors or []
+        for node in gltf2_plan.nodes or []:
+            if node.mesh is None:
+                continue
+
+            # Every node using a mesh draws it, so instances count as many times as they're used
+            mesh = MSFS_ExportBudgets.resolve(meshes, node.mesh)
+            for primitive in mesh.primitives:
+                usage["draw_calls"] += 1
+
+                position = primitive.attributes.get("POSITION")
+                vertex_count = MSFS_ExportBudgets.resolve(accessors, position).count if position is not None else 0
+                usage["vertices"] += vertex_count
+
+                if primitive.mode in (None, 4):
+                    if primitive.indices is not None:
+                        usage["triangles"] += MSFS_ExportBudgets.resolve(accessors, primitive.indices).count // 3
+                    else:
+                        usage["triangles"] += vertex_count // 3
+
+        usage["bin_size"] = sum(buffer.byte_length or 0 for buffer in gltf2_plan.buffers or [])
+
+        texture_dir = export_settings.get("gltf_texturedirectory", "")
+        for uri in {image.uri for image in gltf2_plan.images or [] if isinstance(image.uri, str)}:
+            path = os.path.join(texture_dir, os.path.basename(uri))
+            if os.path.isfile(path):
+                usage["texture_size"] += os.path.getsize(path)
+
+        return usage
+
+    @staticmethod
+    def check(gltf2_plan, export_settings):
+        """
+        Called by the glTF extensions hook once the buffers and images of the file are written
+        """
+        budgets = MSFS_ExportBudgets.current
+        if budgets is not None:
+            budgets.usage = MSFS_ExportBudgets.get_usage(gltf2_plan, export_settings)
+
+    def get_violations(self, budgets):
+        if self.usage is None:
+            return []
+
+        violations = []
+        for key, label, unit in MSFS_ExportBudgets.limits:
+            limit = budgets.get(key, 0)
+            if limit and self.usage[key] > limit:
+                violations.append(f"{self.usage[key]}{unit} {label}, over the budget of {limit}{unit}")
+        return violations
+
+    @contextmanager
+    def active(self, job):
+        budgets = job.options.get("budgets")
+        if not budgets:
+            self.violations = []
+            yield
+            return
+
+        previous = MSFS_ExportBudgets.current
+        MSFS_ExportBudgets.current = self
+        self.usage = None
+        try:
+            yield
+        finally:
+            MSFS_ExportBudgets.current = previous
+
+        self.violations = self.get_violations(budgets)
+        if self.violations and budgets.get("mode") == "FAIL":
+            # Don't leave an over budget file behind to be packaged
+            file_path = MSFS_StagedOutput.get_export_path(job.file_path)
+            for path in (file_path, os.path.splitext(file_path)[0] + ".bin"):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise BudgetExceededError("; ".join(self.violations))
+
+    def finish_job(self, job, result):
+        if result.success:
+            result.warnings.extend(self.violations)
+        self.violations = []
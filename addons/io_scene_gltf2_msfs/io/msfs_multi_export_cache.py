@@ -0,0 +1,393 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import bpy
+import json
+import hashlib
+import numpy as np
+
+from .. import get_version_string
+
+
+class MSFS_ExportFingerprint:
+    """
+    Computes a stable hash of everything that ends up in the glTF file of an export job, so unchanged jobs can be skipped
+    """
+
+    # RNA properties that change without affecting the exported file
+    ignored_properties = {"rna_type", "name_full", "is_evaluated", "original", "users", "session_uid", "tag", "is_runtime_data"}
+    # Material collections that only hold texture paint state, and would hash every pixel of the images in them
+    ignored_material_properties = {"texture_paint_images", "texture_paint_slots", "paint_active_slot"}
+
+    # Attribute data types -> (foreach_get field, values per item, dtype)
+    attribute_fields = {
+        "FLOAT": ("value", 1, np.float32),
+        "INT": ("value", 1, np.int32),
+        "INT8": ("value", 1, np.int32),
+        "BOOLEAN": ("value", 1, np.bool_),
+        "FLOAT2": ("vector", 2, np.float32),
+        "FLOAT_VECTOR": ("vector", 3, np.float32),
+        "FLOAT_COLOR": ("color", 4, np.float32),
+        "BYTE_COLOR": ("color", 4, np.float32),
+    }
+
+    def __init__(self):
+        self.images = {}
+        self.meshes = {}
+        self.materials = {}
+        self.objects = {}
+        self.filters = {}  # Export settings of the job being hashed that decide what's exported from an object
+        # Properties every node has, which don't change what it does
+        self.node_properties = {prop.identifier for prop in bpy.types.Node.bl_rna.properties}
+
+    @staticmethod
+    def hash_array(hasher, collection, attribute, dtype, size):
+        array = np.empty(len(collection) * size, dtype=dtype)
+        collection.foreach_get(attribute, array)
+        hasher.update(array.tobytes())
+
+    def hash_properties(self, hasher, struct, prefix=None, exclude=()):
+        for prop in struct.bl_rna.properties:
+            identifier = prop.identifier
+            if identifier in MSFS_ExportFingerprint.ignored_properties or identifier in exclude:
+                continue
+            if prefix is not None and not identifier.startswith(prefix):
+                continue
+
+            try:
+                value = getattr(struct, identifier)
+            except AttributeError:
+                continue
+
+            if prop.type == "POINTER":
+                if isinstance(value, bpy.types.Image):
+                    value = self.hash_image(value)
+                elif isinstance(value, bpy.types.Object):
+                    # Objects used by modifiers and constraints change the result with their transform and data
+                    value = self.hash_referenced_object(value)
+                elif isinstance(value, bpy.types.ID):
+                    value = value.name
+                else:
+                    continue
+            elif prop.type == "COLLECTION":
+                for item in value:
+                    self.hash_properties(hasher, item)
+                continue
+            elif prop.type in {"BOOLEAN", "INT", "FLOAT"} and getattr(prop, "is_array", False):
+                value = tuple(value)
+
+            hasher.update(f"{identifier}={value!r};".encode())
+
+    @staticmethod
+    def hash_id_properties(hasher, struct):
+        # Custom properties, exported as extras, and the inputs of geometry nodes modifiers
+        try:
+            keys = sorted(struct.keys())
+        except TypeError:
+            return  # The type has no ID properties
+
+        for key in keys:
+            value = struct[key]
+            if hasattr(value, "to_dict"):
+                value = value.to_dict()
+            elif hasattr(value, "to_list"):
+                value = value.to_list()
+            hasher.update(f"[{key}]={value!r};".encode())
+
+    def hash_image(self, image):
+        if image in self.images:
+            return self.images[image]
+
+        hasher = hashlib.sha1()
+        hasher.update(f"{image.name}|{image.source}|{tuple(image.size)}".encode())
+        if image.packed_file is not None:
+            hasher.update(image.packed_file.data)
+        elif image.is_dirty or image.source == "GENERATED":
+            pixels = np.empty(len(image.pixels), dtype=np.float32)
+            image.pixels.foreach_get(pixels)
+            hasher.update(pixels.tobytes())
+        else:
+            file_path = bpy.path.abspath(image.filepath_raw, library=image.library)
+            try:
+                stat = os.stat(file_path)
+                hasher.update(f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+            except OSError:
+                hasher.update(file_path.encode())
+
+        self.images[image] = hasher.hexdigest()
+        return self.images[image]
+
+    def hash_node_tree(self, hasher, node_tree):
+        if node_tree is None:
+            return
+
+        for node in node_tree.nodes:
+            hasher.update(f"{node.bl_idname}|{node.name}|{node.mute}".encode())
+            # Settings of the node type, like the UV map of a Normal Map node or the interpolation of an image
+            self.hash_properties(hasher, node, exclude=self.node_properties)
+            if node.bl_idname in {"ShaderNodeGroup", "GeometryNodeGroup"}:
+                self.hash_node_tree(hasher, node.node_tree)
+
+            for socket in node.inputs:
+                if hasattr(socket, "default_value"):
+                    value = socket.default_value
+                    if hasattr(value, "__len__") and not isinstance(value, str):
+                        value = tuple(value)
+                    hasher.update(f"{socket.identifier}={value!r};".encode())
+
+        for link in node_tree.links:
+            hasher.update(
+                f"{link.from_node.name}.{link.from_socket.identifier}>{link.to_node.name}.{link.to_socket.identifier}".encode()
+            )
+
+    def hash_material(self, material):
+        if material in self.materials:
+            return self.materials[material]
+
+        hasher = hashlib.sha1()
+        hasher.update(material.name.encode())
+        # Every setting rather than the ones known to be exported, like the blend mode, backface culling and alpha
+        # threshold, so skipping never keeps a file whose material changed
+        self.hash_properties(hasher, material, exclude=MSFS_ExportFingerprint.ignored_material_properties)
+        MSFS_ExportFingerprint.hash_id_properties(hasher, material)
+        if material.use_nodes:
+            self.hash_node_tree(hasher, material.node_tree)
+
+        self.materials[material] = hasher.hexdigest()
+        return self.materials[material]
+
+    @staticmethod
+    def hash_attributes(hasher, mesh):
+        # Covers color attributes on any domain, sharp edges and other generic attributes
+        for attribute in mesh.attributes:
+            field = MSFS_ExportFingerprint.attribute_fields.get(attribute.data_type)
+            # Names starting with a dot are internal, like the selection in edit mode
+            if field is None or attribute.name == "position" or attribute.name.startswith("."):
+                continue
+            hasher.update(f"{attribute.name}|{attribute.domain}|{attribute.data_type}".encode())
+            MSFS_ExportFingerprint.hash_array(hasher, attribute.data, *field)
+
+    @staticmethod
+    def hash_normals(hasher, mesh):
+        hasher.update(
+            f"{getattr(mesh, 'use_auto_smooth', False)}|{getattr(mesh, 'auto_smooth_angle', 0.0)}".encode()
+        )
+        if "use_edge_sharp" in bpy.types.MeshEdge.bl_rna.properties:
+            MSFS_ExportFingerprint.hash_array(hasher, mesh.edges, "use_edge_sharp", np.bool_, 1)
+
+        if mesh.has_custom_normals:
+            if hasattr(mesh, "calc_normals_split"):
+                mesh.calc_normals_split()
+            MSFS_ExportFingerprint.hash_array(hasher, mesh.loops, "normal", np.float32, 3)
+
+    @staticmethod
+    def hash_weights(hasher, mesh):
+        # Blender has no bulk access to weights, so each vertex's groups are read with foreach_get into one array
+        # instead of creating Python objects for every weight
+        vertices = mesh.vertices
+        counts = [len(vertex.groups) for vertex in vertices]
+        total = sum(counts)
+        groups = np.empty(total, dtype=np.int32)
+        weights = np.empty(total, dtype=np.float32)
+
+        start = 0
+        for vertex, count in zip(vertices, counts):
+            if count:
+                end = start + count
+                vertex.groups.foreach_get("group", groups[start:end])
+                vertex.groups.foreach_get("weight", weights[start:end])
+                start = end
+
+        hasher.update(np.array(counts, dtype=np.int32).tobytes())
+        hasher.update(groups.tobytes())
+        hasher.update(weights.tobytes())
+
+    def hash_mesh(self, mesh, weights=False):
+        key = (mesh, weights)
+        if key in self.meshes:
+            return self.meshes[key]
+
+        hasher = hashlib.sha1()
+        hasher.update(f"{mesh.name}|{len(mesh.vertices)}|{len(mesh.polygons)}".encode())
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.vertices, "co", np.float32, 3)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.loops, "vertex_index", np.int32, 1)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.polygons, "loop_total", np.int32, 1)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.polygons, "material_index", np.int32, 1)
+        MSFS_ExportFingerprint.hash_array(hasher, mesh.polygons, "use_smooth", np.bool_, 1)
+        for uv_layer in mesh.uv_layers:
+            hasher.update(uv_layer.name.encode())
+            MSFS_ExportFingerprint.hash_array(hasher, uv_layer.data, "uv", np.float32, 2)
+        for vertex_colors in mesh.vertex_colors:
+            hasher.update(vertex_colors.name.encode())
+            MSFS_ExportFingerprint.hash_array(hasher, vertex_colors.data, "color", np.float32, 4)
+        if mesh.shape_keys is not None:
+            for key_block in mesh.shape_keys.key_blocks:
+                hasher.update(f"{key_block.name}|{key_block.value}".encode())
+                MSFS_ExportFingerprint.hash_array(hasher, key_block.data, "co", np.float32, 3)
+        MSFS_ExportFingerprint.hash_normals(hasher, mesh)
+        MSFS_ExportFingerprint.hash_attributes(hasher, mesh)
+        if weights:
+            MSFS_ExportFingerprint.hash_weights(hasher, mesh)
+
+        self.meshes[key] = hasher.hexdigest()
+        return self.meshes[key]
+
+    def hash_animation(self, hasher, animation_data):
+        if animation_data is None:
+            return
+
+        actions = [animation_data.action]
+        for track in animation_data.nla_tracks:
+            hasher.update(f"{track.name}|{track.mute}".encode())
+            actions.extend(strip.action for strip in track.strips)
+
+        for action in actions:
+            if action is None:
+                continue
+            hasher.update(action.name.encode())
+            for fcurve in action.fcurves:
+                hasher.update(f"{fcurve.data_path}[{fcurve.array_index}]".encode())
+                MSFS_ExportFingerprint.hash_array(hasher, fcurve.keyframe_points, "co", np.float32, 2)
+
+    def hash_object(self, hasher, obj):
+        hasher.update(f"{obj.name}|{obj.type}|{obj.parent.name if obj.parent else ''}".encode())
+        hasher.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+
+        # Visibility only decides what's exported with the matching filter
+        if self.filters.get("use_renderable"):
+            hasher.update(f"hide_render={obj.hide_render}".encode())
+        if self.filters.get("use_visible"):
+            hasher.update(f"visible={obj.visible_get()}".encode())
+
+        self.hash_properties(hasher, obj, prefix="msfs_")
+        MSFS_ExportFingerprint.hash_id_properties(hasher, obj)
+        self.hash_animation(hasher, obj.animation_data)
+
+        for modifier in obj.modifiers:
+            self.hash_properties(hasher, modifier)
+            MSFS_ExportFingerprint.hash_id_properties(hasher, modifier)
+            if modifier.type == "NODES":
+                self.hash_node_tree(hasher, modifier.node_group)
+        for constraint in obj.constraints:
+            self.hash_properties(hasher, constraint)
+
+        for slot in obj.material_slots:
+            if slot.material is not None:
+                hasher.update(self.hash_material(slot.material).encode())
+
+        if obj.data is not None:
+            MSFS_ExportFingerprint.hash_id_properties(hasher, obj.data)
+
+        if obj.type == "MESH":
+            hasher.update("|".join(group.name for group in obj.vertex_groups).encode())
+            # Weights are only exported for skins
+            skinned = (
+                self.filters.get("export_skins", True)
+                and len(obj.vertex_groups) > 0
+                and obj.find_armature() is not None
+            )
+            hasher.update(self.hash_mesh(obj.data, skinned).encode())
+            if obj.data.shape_keys is not None:
+                self.hash_animation(hasher, obj.data.shape_keys.animation_data)
+        elif obj.data is not None:
+            self.hash_properties(hasher, obj.data)
+
+        if obj.instance_type == "COLLECTION" and obj.instance_collection is not None:
+            for instanced_obj in obj.instance_collection.all_objects:
+                self.hash_object(hasher, instanced_obj)
+
+    def hash_referenced_object(self, obj):
+        # The hash depends on the filters of the job, which can differ between jobs
+        key = (obj, tuple(sorted(self.filters.items())))
+        if key in self.objects:
+            # None while the object itself is hashed, when objects reference each other
+            return self.objects[key] or obj.name
+
+        self.objects[key] = None
+        hasher = hashlib.sha1()
+        self.hash_object(hasher, obj)
+        self.objects[key] = hasher.hexdigest()
+        return self.objects[key]
+
+    def compute(self, job):
+        hasher = hashlib.sha1()
+        hasher.update(get_version_string().encode())
+        hasher.update(json.dumps(job.settings, sort_keys=True).encode())
+        hasher.update(json.dumps(job.options, sort_keys=True).encode())
+        hasher.update(str(bpy.context.scene.msfs_exporter_properties.enabled).encode())
+
+        self.filters = {
+            key: job.settings.get(key)
+            for key in ("use_visible", "use_renderable", "export_skins")
+            if key in job.settings
+        }
+
+        for name in sorted(job.objects):
+            obj = bpy.data.objects.get(name)
+            if obj is not None:
+                self.hash_object(hasher, obj)
+
+        return hasher.hexdigest()
+
+
+class MSFS_MultiExportCache:
+    """
+    Per-folder record of what was last exported, stored next to the glTF files
+    """
+
+    file_name = ".msfs_multi_export.json"
+
+    def __init__(self):
+        self.folders = {}
+        self.modified = set()
+
+    def load_folder(self, folder):
+        if folder not in self.folders:
+            entries = {}
+            cache_path = os.path.join(folder, MSFS_MultiExportCache.file_name)
+            if os.path.exists(cache_path):
+                try:
+                    with open(cache_path, "r") as f:
+                        entries = json.load(f)
+                except (OSError, ValueError):
+                    entries = {}
+            self.folders[folder] = entries
+        return self.folders[folder]
+
+    def get(self, file_path):
+        folder, file_name = os.path.split(os.path.abspath(file_path))
+        return self.load_folder(folder).get(file_name, {})
+
+    def update(self, file_path, **values):
+        folder, file_name = os.path.split(os.path.abspath(file_path))
+        self.load_folder(folder).setdefault(file_name, {}).update(values)
+        self.modified.add(folder)
+
+    def save(self):
+        for folder in self.modified:
+            if not os.path.isdir(folder):
+                continue
+            with open(os.path.join(folder, MSFS_MultiExportCache.file_name), "w") as f:
+                json.dump(self.folders[folder], f, indent=4, sort_keys=True)
+        self.modified.clear()
+
+    def is_up_to_date(self, job):
+        return (
+            job.fingerprint is not None
+            and self.get(job.file_path).get("fingerprint") == job.fingerprint
+            and os.path.exists(job.file_path)
+        )
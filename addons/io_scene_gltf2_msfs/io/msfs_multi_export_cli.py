@@ -0,0 +1,288 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Headless multi-export driven by a manifest file:
+
+    blender --background aircraft.blend --python-expr "import io_scene_gltf2_msfs.io.msfs_multi_export_cli as cli; cli.main()" -- [manifest.json] [--summary summary.json] [--resume]
+
+The manifest is a JSON (or TOML) file. Every key is optional, anything not listed keeps the value saved in the .blend.
+Without a manifest, the file is exported as saved:
+
+    {
+        "mode": "OBJECTS",
+        "reload_lod_groups": true,
+        "only_listed": false,
+        "lod_groups": [
+            {
+                "group_name": "Body",
+                "folder_name": "//export",
+                "generate_xml": true,
+                "overwrite_guid": false,
+                "enabled": true,
+                "lods": [
+                    {"name": "x0_Body", "enabled": true, "lod_value": 70, "file_name": "Body_LOD0"},
+                    {"name": "x1_Body", "overrides": {"override_export_tangents": true, "export_tangents": false}}
+                ]
+            }
+        ],
+        "presets": [
+            {"name": "Interior", "enabled": true, "file_path": "//export/Interior.gltf", "layers": ["Cockpit", "Cabin"]}
+        ],
+        "settings": {"export_tangents": false, "export_skip_unchanged": true}
+    }
+
+A JSON summary is printed to stdout and written to the --summary path if given. The process exits with 0 on success,
+1 if any file failed to export or the export stopped with an error, and 2 if the manifest is invalid. With --resume,
+files that an interrupted run of the same file already exported are skipped if they're still up to date.
+"""
+
+import os
+import sys
+import bpy
+import json
+import time
+import argparse
+import traceback
+
+EXIT_SUCCESS = 0
+EXIT_EXPORT_FAILED = 1
+EXIT_INVALID_MANIFEST = 2
+
+
+class ManifestError(Exception):
+    pass
+
+
+class MSFS_MultiExportManifest:
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def load(path):
+        try:
+            if os.path.splitext(path)[1].lower() == ".toml":
+                try:
+                    import tomllib
+                except ImportError:
+                    raise ManifestError("TOML manifests require Python 3.11 or newer, use JSON instead")
+
+                with open(path, "rb") as f:
+                    return tomllib.load(f)
+
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise ManifestError(f"Could not read manifest {path}: {e}")
+
+    @staticmethod
+    def set_properties(struct, values, ignored=()):
+        for key, value in values.items():
+            if key in ignored:
+                continue
+            if key not in struct.bl_rna.properties:
+                raise ManifestError(f"Unknown property '{key}' on {struct.bl_rna.identifier}")
+            if isinstance(value, dict) and struct.bl_rna.properties[key].type == "POINTER":
+                MSFS_MultiExportManifest.set_properties(getattr(struct, key), value)
+                continue
+            try:
+                setattr(struct, key, value)
+            except (TypeError, ValueError) as e:
+                raise ManifestError(f"Invalid value for '{key}': {e}")
+
+    @staticmethod
+    def apply_lod_groups(context, manifest):
+        lod_groups = context.scene.msfs_multi_exporter_lod_groups
+        sort_by_collection = context.scene.multi_exporter_grouped_by_collections
+
+        listed = {}
+        for data in manifest.get("lod_groups", []):
+            if "group_name" not in data:
+                raise ManifestError("Every LOD group needs a group_name")
+            listed[data["group_name"]] = data
+
+        for lod_group in lod_groups:
+            data = listed.pop(lod_group.group_name, None)
+            if data is None:
+                if manifest.get("only_listed", False):
+                    for lod in lod_group.lods:
+                        lod.enabled = False
+                continue
+
+            MSFS_MultiExportManifest.set_properties(
+                lod_group, data, ignored={"group_name", "enabled", "lods"}
+            )
+
+            if "enabled" in data:
+                for lod in lod_group.lods:
+                    lod.enabled = data["enabled"]
+
+            lods = {
+                (lod.collection.name if sort_by_collection else lod.object.name): lod
+                for lod in lod_group.lods
+                if (lod.collection if sort_by_collection else lod.object) is not None
+            }
+            for lod_data in data.get("lods", []):
+                lod = lods.get(lod_data.get("name"))
+                if lod is None:
+                    raise ManifestError(f"LOD '{lod_data.get('name')}' not found in group '{lod_group.group_name}'")
+                MSFS_MultiExportManifest.set_properties(lod, lod_data, ignored={"name"})
+
+        if listed:
+            raise ManifestError(f"LOD groups not found in file: {', '.join(listed)}")
+
+    @staticmethod
+    def apply_presets(context, manifest):
+        presets = context.scene.msfs_multi_exporter_presets
+
+        listed = {}
+        for data in manifest.get("presets", []):
+            if "name" not in data:
+                raise ManifestError("Every preset needs a name")
+            listed[data["name"]] = data
+
+        existing = {preset.name: preset for preset in presets}
+        for name, data in listed.items():
+            preset = existing.get(name)
+            if preset is None:
+                preset = presets.add()
+                preset.name = name
+                existing[name] = preset
+
+            MSFS_MultiExportManifest.set_properties(preset, data, ignored={"name", "layers"})
+
+            if "layers" in data:
+                preset.layers.clear()
+                for collection_name in data["layers"]:
+                    collection = bpy.data.collections.get(collection_name)
+                    if collection is None:
+                        raise ManifestError(f"Collection '{collection_name}' of preset '{name}' not found")
+                    layer = preset.layers.add()
+                    layer.collection = collection
+                    layer.enabled = True
+
+        if manifest.get("only_listed", False):
+            for preset in presets:
+                if preset.name not in listed:
+                    preset.enabled = False
+
+    @staticmethod
+    def apply(context, manifest):
+        from .msfs_multi_export_objects import MSFS_OT_ReloadLODGroups
+
+        saved_mode = context.scene.msfs_multi_exporter_current_tab
+        mode = manifest.get("mode", saved_mode if saved_mode == "PRESETS" else "OBJECTS")
+        if mode not in {"OBJECTS", "PRESETS"}:
+            raise ManifestError(f"Invalid mode '{mode}', expected OBJECTS or PRESETS")
+        context.scene.msfs_multi_exporter_current_tab = mode
+
+        MSFS_MultiExportManifest.set_properties(
+            context.scene.msfs_multi_exporter_settings, manifest.get("settings", {})
+        )
+
+        if mode == "OBJECTS":
+            if manifest.get("reload_lod_groups", True):
+                MSFS_OT_ReloadLODGroups.reload_lod_groups(None, context)
+            MSFS_MultiExportManifest.apply_lod_groups(context, manifest)
+        else:
+            MSFS_MultiExportManifest.apply_presets(context, manifest)
+
+
+def export(context, summary, resume=False):
+    from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+
+    queue = MSFS_OT_MultiExportGLTF2.create_queue(context, resume)
+    try:
+        while not queue.done:
+            if queue.workers is not None:
+                time.sleep(0.1)
+            queue.step()
+    except BaseException:
+        queue.abort()
+        raise
+    results = queue.finish()
+
+    for job in queue.resumed:
+        summary["files"].append({"file_path": job.file_path, "skipped": False, "resumed": True})
+    for job in queue.skipped:
+        summary["files"].append({"file_path": job.file_path, "skipped": True})
+    for result in results:
+        summary["files"].append(dict(result.to_dict(), skipped=False))
+
+    summary["exported"] = sum(result.success for result in results)
+    summary["failed"] = sum(not result.success for result in results)
+    summary["skipped"] = len(queue.skipped)
+    summary["resumed"] = len(queue.resumed)
+    summary["worker_balance"] = queue.balance_summary
+    summary["exit_code"] = EXIT_EXPORT_FAILED if summary["failed"] else EXIT_SUCCESS
+
+
+def run(manifest_path=None, summary_path=None, resume=False):
+    context = bpy.context
+    start_time = time.perf_counter()
+
+    summary = {
+        "blend_file": bpy.data.filepath,
+        "manifest": os.path.abspath(manifest_path) if manifest_path else None,
+        "files": [],
+    }
+
+    try:
+        manifest = MSFS_MultiExportManifest.load(manifest_path) if manifest_path else {}
+        MSFS_MultiExportManifest.apply(context, manifest)
+    except ManifestError as e:
+        summary["error"] = str(e)
+        summary["exit_code"] = EXIT_INVALID_MANIFEST
+    else:
+        try:
+            export(context, summary, resume)
+        except Exception as e:
+            # Still write the summary, so a caller can tell what went wrong
+            traceback.print_exc()
+            summary["error"] = f"{type(e).__name__}: {e}"
+            summary["exit_code"] = EXIT_EXPORT_FAILED
+
+    summary["duration"] = time.perf_counter() - start_time
+
+    if summary_path:
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=4)
+    print(json.dumps(summary, indent=4))
+
+    return summary["exit_code"]
+
+
+def main():
+    from .msfs_multi_export_worker import enable_addon
+
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(
+        prog="msfs_multi_export_cli",
+        description="Run the MSFS multi-exporter on the open .blend file",
+    )
+    parser.add_argument("manifest", nargs="?", help="JSON or TOML manifest describing what to export")
+    parser.add_argument("--summary", help="Path to write the JSON summary to")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the files an interrupted run already exported",
+    )
+    args = parser.parse_args(argv)
+
+    enable_addon()
+
+    sys.exit(run(args.manifest, args.summary, args.resume))
@@ -0,0 +1,309 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import bpy
+import numpy as np
+
+from contextlib import contextmanager
+
+from .msfs_multi_export_profiler import MSFS_ExportProfiler
+
+
+class FlattenedMeshData:
+    """
+    Geometry of one object in the space of the object it's merged into
+    """
+
+    def __init__(self, mesh, matrix, material_indices):
+        self.co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", self.co)
+        self.co = self.co.reshape(-1, 3)
+
+        self.vertex_index = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", self.vertex_index)
+
+        mesh.calc_normals_split()
+        self.normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+        mesh.loops.foreach_get("normal", self.normals)
+        self.normals = self.normals.reshape(-1, 3)
+
+        self.loop_total = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", self.loop_total)
+
+        self.material_index = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("material_index", self.material_index)
+        if len(material_indices) > 0:
+            self.material_index = np.asarray(material_indices, dtype=np.int32)[
+                np.clip(self.material_index, 0, len(material_indices) - 1)
+            ]
+        else:
+            self.material_index[:] = 0
+
+        self.use_smooth = np.empty(len(mesh.polygons), dtype=bool)
+        mesh.polygons.foreach_get("use_smooth", self.use_smooth)
+
+        self.uvs = {}
+        for uv_layer in mesh.uv_layers:
+            uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            uv_layer.data.foreach_get("uv", uv)
+            self.uvs[uv_layer.name] = uv.reshape(-1, 2)
+
+        self.colors = {}
+        for vertex_colors in mesh.vertex_colors:
+            color = np.empty(len(mesh.loops) * 4, dtype=np.float32)
+            vertex_colors.data.foreach_get("color", color)
+            self.colors[vertex_colors.name] = color.reshape(-1, 4)
+
+        self.transform(np.array(matrix, dtype=np.float64))
+
+    def transform(self, matrix):
+        rotation = matrix[:3, :3]
+        self.co = (self.co @ rotation.T + matrix[:3, 3]).astype(np.float32)
+
+        normals = self.normals @ np.linalg.inv(rotation)
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        self.normals = (normals / np.maximum(lengths, 1e-12)).astype(np.float32)
+
+        # A mirroring transform turns faces inside out, so reverse their winding
+        if np.linalg.det(rotation) < 0 and len(self.loop_total) > 0:
+            loop_start = np.cumsum(self.loop_total) - self.loop_total
+            starts = np.repeat(loop_start, self.loop_total)
+            totals = np.repeat(self.loop_total, self.loop_total)
+            local = np.arange(len(self.vertex_index)) - starts
+            order = starts + totals - 1 - local
+
+            self.vertex_index = self.vertex_index[order]
+            self.normals = self.normals[order]
+            self.uvs = {name: uv[order] for name, uv in self.uvs.items()}
+            self.colors = {name: color[order] for name, color in self.colors.items()}
+
+
+class MSFS_FlattenHierarchy:
+    """
+    Merges the static meshes of a LOD into as few objects as possible for the duration of its export. Objects that are
+    animated, skinned or collision gizmos stay separate, as does the hierarchy leading to them. The merged meshes are
+    temporary, the objects of the .blend aren't modified
+    """
+
+    def __init__(self):
+        self.objects = []
+        self.meshes = []
+
+    @staticmethod
+    def is_static(obj):
+        if obj.type != "MESH" or obj.data.shape_keys is not None:
+            return False
+        if obj.animation_data is not None and (obj.animation_data.action or len(obj.animation_data.nla_tracks) > 0):
+            return False
+        if len(obj.constraints) > 0 or obj.parent_type in {"ARMATURE", "BONE"}:
+            return False
+        if any(modifier.type == "ARMATURE" for modifier in obj.modifiers):
+            return False
+        if getattr(obj, "msfs_gizmo_type", "NONE") != "NONE":
+            return False
+        return True
+
+    @staticmethod
+    def is_exported(obj, settings):
+        # Same filters as the glTF exporter, objects it would leave out mustn't end up in a merged mesh
+        if settings.get("use_visible", False) and not obj.visible_get():
+            return False
+        if settings.get("use_renderable", False) and obj.hide_render:
+            return False
+        return True
+
+    @staticmethod
+    def get_groups(objects, settings):
+        """
+        Returns {object to merge into, or None for world space: [objects to merge]}. An object can only be merged if
+        everything below it can be merged too, otherwise the hierarchy to the objects that stay separate would break.
+        Objects the exporter leaves out stay separate, so it still leaves them out
+        """
+        object_set = set(objects)
+        children = {}
+        for obj in objects:
+            children.setdefault(obj.parent if obj.parent in object_set else None, []).append(obj)
+
+        mergeable = {}
+
+        def visit(obj):
+            result = MSFS_FlattenHierarchy.is_static(obj) and MSFS_FlattenHierarchy.is_exported(obj, settings)
+            for child in children.get(obj, ()):
+                result = visit(child) and result
+            mergeable[obj] = result
+            return result
+
+        for root in children.get(None, ()):
+            visit(root)
+
+        groups = {}
+        for obj in objects:
+            if not mergeable[obj]:
+                continue
+
+            # Merge into the nearest ancestor that stays separate
+            anchor = obj.parent if obj.parent in object_set else None
+            while anchor is not None and mergeable[anchor]:
+                anchor = anchor.parent if anchor.parent in object_set else None
+            groups.setdefault(anchor, []).append(obj)
+
+        return groups
+
+    def merge(self, anchor, objects, settings, depsgraph):
+        anchor_inverse = anchor.matrix_world.inverted() if anchor is not None else None
+
+        materials = []
+        parts = []
+        evaluated_objects = []
+        try:
+            for obj in objects:
+                if settings.get("export_apply", False):
+                    evaluated = obj.evaluated_get(depsgraph)
+                    mesh = evaluated.to_mesh()
+                    evaluated_objects.append(evaluated)
+                else:
+                    mesh = obj.data
+
+                # An object without material slots gets an empty one, not the first material of another object
+                slot_materials = [slot.material for slot in obj.material_slots] or [None]
+                material_indices = []
+                for material in slot_materials:
+                    if material not in materials:
+                        materials.append(material)
+                    material_indices.append(materials.index(material))
+
+                matrix = obj.matrix_world if anchor_inverse is None else anchor_inverse @ obj.matrix_world
+                parts.append(FlattenedMeshData(mesh, matrix, material_indices))
+        finally:
+            for evaluated in evaluated_objects:
+                evaluated.to_mesh_clear()
+
+        name = f"{anchor.name if anchor is not None else objects[0].name}_flattened"
+        mesh = MSFS_FlattenHierarchy.create_mesh(name, parts, materials)
+        self.meshes.append(mesh)
+
+        flattened = bpy.data.objects.new(name, mesh)
+        self.objects.append(flattened)
+        if settings.get("use_active_collection", False):
+            bpy.context.view_layer.active_layer_collection.collection.objects.link(flattened)
+        else:
+            bpy.context.scene.collection.objects.link(flattened)
+        flattened.parent = anchor
+        return flattened
+
+    @staticmethod
+    def create_mesh(name, parts, materials):
+        vertex_offsets = np.cumsum([0] + [len(part.co) for part in parts])
+
+        co = np.concatenate([part.co for part in parts])
+        vertex_index = np.concatenate(
+            [part.vertex_index + offset for part, offset in zip(parts, vertex_offsets)]
+        )
+        normals = np.concatenate([part.normals for part in parts])
+        loop_total = np.concatenate([part.loop_total for part in parts])
+        loop_start = np.cumsum(loop_total) - loop_total
+
+        mesh = bpy.data.meshes.new(name)
+        mesh.vertices.add(len(co))
+        mesh.loops.add(len(vertex_index))
+        mesh.polygons.add(len(loop_total))
+
+        mesh.vertices.foreach_set("co", co.ravel())
+        mesh.loops.foreach_set("vertex_index", vertex_index)
+        mesh.polygons.foreach_set("loop_start", loop_start.astype(np.int32))
+        mesh.polygons.foreach_set("loop_total", loop_total)
+        mesh.polygons.foreach_set(
+            "material_index", np.concatenate([part.material_index for part in parts])
+        )
+        mesh.polygons.foreach_set(
+            "use_smooth", np.concatenate([part.use_smooth for part in parts])
+        )
+
+        # Layers missing from some of the objects are filled with zeros for their loops
+        for layer_name in dict.fromkeys(layer for part in parts for layer in part.uvs):
+            uv_layer = mesh.uv_layers.new(name=layer_name)
+            uv_layer.data.foreach_set(
+                "uv",
+                np.concatenate(
+                    [part.uvs.get(layer_name, np.zeros((len(part.vertex_index), 2), dtype=np.float32)) for part in parts]
+                ).ravel(),
+            )
+
+        for layer_name in dict.fromkeys(layer for part in parts for layer in part.colors):
+            vertex_colors = mesh.vertex_colors.new(name=layer_name)
+            vertex_colors.data.foreach_set(
+                "color",
+                np.concatenate(
+                    [part.colors.get(layer_name, np.ones((len(part.vertex_index), 4), dtype=np.float32)) for part in parts]
+                ).ravel(),
+            )
+
+        for material in materials:
+            mesh.materials.append(material)
+
+        mesh.update(calc_edges=True)
+
+        # Keep the shading of every object, including custom normals
+        mesh.use_auto_smooth = True
+        mesh.normals_split_custom_set(normals)
+
+        return mesh
+
+    def clear(self):
+        for obj in self.objects:
+            bpy.data.objects.remove(obj)
+        for mesh in self.meshes:
+            bpy.data.meshes.remove(mesh)
+        self.objects = []
+        self.meshes = []
+
+    @contextmanager
+    def active(self, job):
+        if not job.options.get("flatten"):
+            yield
+            return
+
+        from .msfs_multi_export_objects import MSFS_LODGroupIndex
+
+        job_objects = job.objects
+        # The temporary objects aren't LODs, keep the LOD group index from picking them up
+        index_updating = MSFS_LODGroupIndex.updating
+        MSFS_LODGroupIndex.updating = True
+        try:
+            with MSFS_ExportProfiler.phase("flatten"):
+                objects = [bpy.data.objects.get(name) for name in job_objects]
+                objects = [obj for obj in objects if obj is not None]
+                depsgraph = bpy.context.evaluated_depsgraph_get()
+
+                merged = set()
+                for anchor, group in MSFS_FlattenHierarchy.get_groups(objects, job.settings).items():
+                    # A single object would only be replaced by a copy of itself
+                    if len(group) > 1:
+                        self.merge(anchor, group, job.settings, depsgraph)
+                        merged.update(group)
+
+                bpy.context.view_layer.update()
+
+                # Export the flattened objects in place of the ones they were merged from
+                job.objects = [obj.name for obj in objects if obj not in merged] + [
+                    obj.name for obj in self.objects
+                ]
+
+            yield
+        finally:
+            job.objects = job_objects
+            self.clear()
+            MSFS_LODGroupIndex.updating = index_updating
@@ -0,0 +1,35 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from contextlib import contextmanager
+
+
+@contextmanager
+def patch(owner, name, wrap):
+    """
+    Temporarily replace owner.name with wrap(original) while the multi-exporter runs the Khronos exporter.
+    If the Khronos exporter doesn't have the attribute (e.g. a different version), nothing is patched and False is yielded
+    """
+    original = getattr(owner, name, None)
+    if original is None:
+        yield False
+        return
+
+    setattr(owner, name, wrap(original))
+    try:
+        yield True
+    finally:
+        setattr(owner, name, original)
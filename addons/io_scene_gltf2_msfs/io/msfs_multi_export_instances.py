@@ -0,0 +1,79 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import bpy
+
+from contextlib import contextmanager
+
+from .msfs_multi_export_hooks import patch
+
+
+class MSFS_KeepInstances:
+    """
+    Exports objects that use the same mesh and materials as one glTF mesh referenced by all of their nodes. The glTF
+    exporter already shares meshes when modifiers aren't applied, but with Apply Modifiers every object is evaluated
+    into a new mesh, so linked duplicates and collection instances each get a full copy
+    """
+
+    def __init__(self):
+        self.meshes = {}
+
+    @staticmethod
+    def get_key(blender_object):
+        # Modifiers make the exported mesh depend on the object, so only plain linked data can be shared
+        if blender_object.type != "MESH" or len(blender_object.modifiers) > 0:
+            return None
+        return (
+            blender_object.data,
+            tuple(None if slot.material is None else slot.material.name for slot in blender_object.material_slots),
+        )
+
+    def wrap_gather_mesh(self, gather_mesh):
+        # The arguments differ between glTF exporter versions, but always include the object
+        def shared_gather_mesh(*args, **kwargs):
+            blender_object = next(
+                (arg for arg in args if isinstance(arg, bpy.types.Object)),
+                kwargs.get("blender_object"),
+            )
+            key = None if blender_object is None else MSFS_KeepInstances.get_key(blender_object)
+            if key is None:
+                return gather_mesh(*args, **kwargs)
+
+            if key not in self.meshes:
+                self.meshes[key] = gather_mesh(*args, **kwargs)
+            return self.meshes[key]
+
+        return shared_gather_mesh
+
+    @contextmanager
+    def active(self, job):
+        if not job.options.get("keep_instances"):
+            yield
+            return
+
+        try:
+            from io_scene_gltf2.blender.exp import gltf2_blender_gather_nodes
+        except ImportError:
+            yield
+            return
+
+        # Module level, so the name isn't mangled
+        self.meshes = {}
+        try:
+            with patch(gltf2_blender_gather_nodes, "__gather_mesh", self.wrap_gather_mesh):
+                yield
+        finally:
+            self.meshes = {}
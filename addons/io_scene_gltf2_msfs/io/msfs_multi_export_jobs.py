@@ -0,0 +1,285 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import bpy
+import time
+import traceback
+
+from contextlib import ExitStack, contextmanager
+
+from .msfs_multi_export_profiler import MSFS_ExportProfiler
+from .msfs_multi_export_staging import MSFS_StagedOutput
+
+
+class MultiExportJob:
+    """
+    A single glTF file written by the multi-exporter. Objects are stored by name so jobs can be handed to background workers.
+    Settings are passed to the glTF exporter, options are used by the multi-exporter itself
+    """
+
+    def __init__(self, file_path, objects, settings, group_name="", fingerprint=None, options=None):
+        self.file_path = file_path
+        self.objects = objects
+        self.settings = settings
+        self.group_name = group_name
+        self.fingerprint = fingerprint
+        self.options = options if options is not None else {}
+
+    def to_dict(self):
+        return {
+            "file_path": self.file_path,
+            "objects": self.objects,
+            "settings": self.settings,
+            "group_name": self.group_name,
+            "fingerprint": self.fingerprint,
+            "options": self.options,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return MultiExportJob(
+            data["file_path"],
+            data["objects"],
+            data["settings"],
+            data.get("group_name", ""),
+            data.get("fingerprint"),
+            data.get("options"),
+        )
+
+
+class MultiExportResult:
+    def __init__(self, file_path, success=True, error=None, duration=0.0, profile=None, warnings=None):
+        self.file_path = file_path
+        self.success = success
+        self.error = error
+        self.duration = duration
+        self.profile = profile
+        self.warnings = warnings if warnings is not None else []
+
+    def to_dict(self):
+        return {
+            "file_path": self.file_path,
+            "success": self.success,
+            "error": self.error,
+            "duration": self.duration,
+            "profile": self.profile,
+            "warnings": self.warnings,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        return MultiExportResult(
+            data["file_path"],
+            data.get("success", False),
+            data.get("error"),
+            data.get("duration", 0.0),
+            data.get("profile"),
+            data.get("warnings"),
+        )
+
+
+class MSFS_MultiExportJobs:
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def get_lod_file_path(lod_group, lod):
+        return os.path.join(
+            bpy.path.abspath(lod_group.folder_name),
+            os.path.splitext(lod.file_name)[0] + ".gltf",
+        )
+
+    @staticmethod
+    def gather_lod_objects(context, lod, view_layer_objects, view_layer_children):
+        if context.scene.multi_exporter_grouped_by_collections:
+            # Objects of excluded child collections can't be selected for the export
+            return [obj.name for obj in lod.collection.all_objects if obj in view_layer_objects]
+
+        if lod.object not in view_layer_children.get(lod.object.parent, ()):
+            return []
+
+        # Walk the hierarchy below the LOD object, skipping anything that isn't in the view layer
+        objects = []
+        stack = [lod.object]
+        while stack:
+            obj = stack.pop()
+            objects.append(obj.name)
+            stack.extend(view_layer_children.get(obj, ()))
+
+        return objects
+
+    @staticmethod
+    def gather_preset_objects(preset, view_layer_objects):
+        # Walk every enabled layer and its children once, even when nested layers are enabled as well
+        collections = []
+        visited = set()
+        stack = [
+            layer.collection
+            for layer in reversed(preset.layers)
+            if layer.enabled and layer.collection is not None
+        ]
+        while stack:
+            collection = stack.pop()
+            if collection in visited:
+                continue
+            visited.add(collection)
+            collections.append(collection)
+            stack.extend(reversed(collection.children))
+
+        # Objects can be linked to several collections, keep the first occurrence only
+        objects = {}
+        for collection in collections:
+            for obj in collection.objects:
+                if obj in view_layer_objects:
+                    objects.setdefault(obj.name)
+
+        return list(objects)
+
+    @staticmethod
+    def gather(context):
+        from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+        from .msfs_multi_export_objects import MSFS_LODGroupUtility
+
+        settings = MSFS_OT_MultiExportGLTF2.get_export_settings(
+            context.scene.msfs_multi_exporter_settings
+        )
+
+        # Built once per run so scoping a LOD or preset is linear in its size.
+        # Object.children scans every object in the file, so use our own parent to children map
+        view_layer_objects = set()
+        view_layer_children = {}
+        for obj in context.view_layer.objects:
+            view_layer_objects.add(obj)
+            view_layer_children.setdefault(obj.parent, set()).add(obj)
+
+        jobs = []
+        if context.scene.msfs_multi_exporter_current_tab == "OBJECTS":
+            for lod_group in context.scene.msfs_multi_exporter_lod_groups:
+                for lod in lod_group.lods:
+                    if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
+                        continue
+
+                    if lod.enabled:
+                        jobs.append(
+                            MultiExportJob(
+                                MSFS_MultiExportJobs.get_lod_file_path(lod_group, lod),
+                                MSFS_MultiExportJobs.gather_lod_objects(
+                                    context, lod, view_layer_objects, view_layer_children
+                                ),
+                                lod.overrides.apply(dict(settings)),
+                                lod_group.group_name,
+                                options={
+                                    "keep_instances": lod.keep_instances,
+                                    "flatten": lod.flatten_on_export,
+                                    "budgets": lod_group.get_budgets(),
+                                },
+                            )
+                        )
+
+        elif context.scene.msfs_multi_exporter_current_tab == "PRESETS":
+            for preset in context.scene.msfs_multi_exporter_presets:
+                if preset.enabled:
+                    jobs.append(
+                        MultiExportJob(
+                            bpy.path.ensure_ext(
+                                bpy.path.abspath(preset.file_path), ".gltf"
+                            ),
+                            MSFS_MultiExportJobs.gather_preset_objects(
+                                preset, view_layer_objects
+                            ),
+                            preset.overrides.apply(dict(settings)),
+                            preset.name,
+                        )
+                    )
+
+        return jobs
+
+    @staticmethod
+    @contextmanager
+    def scope(job):
+        """
+        The glTF exporter can only be limited to selected objects, so select the job's objects for the duration of the export
+        and restore the user's selection afterwards
+        """
+        view_layer = bpy.context.view_layer
+        previous_selection = [obj.name for obj in bpy.context.selected_objects]
+        previous_active = view_layer.objects.active.name if view_layer.objects.active is not None else None
+
+        objects = [view_layer.objects.get(name) for name in job.objects]
+        objects = [obj for obj in objects if obj is not None]
+
+        try:
+            for obj in bpy.context.selected_objects:
+                obj.select_set(False)
+            for obj in objects:
+                obj.select_set(True)
+
+            yield
+        finally:
+            # Looked up by name, the export or a hook may have removed objects
+            for name in job.objects:
+                obj = view_layer.objects.get(name)
+                if obj is not None:
+                    obj.select_set(False)
+            for name in previous_selection:
+                obj = view_layer.objects.get(name)
+                if obj is not None:
+                    obj.select_set(True)
+            view_layer.objects.active = view_layer.objects.get(previous_active) if previous_active is not None else None
+
+    @staticmethod
+    def export(job):
+        from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+
+        with ExitStack() as stack:
+            with MSFS_ExportProfiler.phase("scoping"):
+                stack.enter_context(MSFS_MultiExportJobs.scope(job))
+            MSFS_OT_MultiExportGLTF2.export(
+                MSFS_StagedOutput.get_export_path(job.file_path), job.settings
+            )
+
+    @staticmethod
+    def run(jobs, hooks=()):
+        """
+        Export jobs in this process. Each hook provides an active(job) context manager wrapped around the export of a job
+        """
+        results = []
+        for job in jobs:
+            start_time = time.perf_counter()
+            try:
+                with ExitStack() as stack:
+                    for hook in hooks:
+                        stack.enter_context(hook.active(job))
+                    MSFS_MultiExportJobs.export(job)
+                result = MultiExportResult(
+                    job.file_path, duration=time.perf_counter() - start_time
+                )
+            except Exception as e:
+                traceback.print_exc()
+                result = MultiExportResult(
+                    job.file_path,
+                    success=False,
+                    error=f"{type(e).__name__}: {e}",
+                    duration=time.perf_counter() - start_time,
+                )
+
+            # Let hooks attach what they collected during the export to the result
+            for hook in hooks:
+                if hasattr(hook, "finish_job"):
+                    hook.finish_job(job, result)
+            results.append(result)
+        return results
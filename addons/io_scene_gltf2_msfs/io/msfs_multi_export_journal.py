@@ -0,0 +1,101 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import bpy
+import json
+import time
+
+
+class MSFS_MultiExportJournal:
+    """
+    Append-only record of the files a multi-export run finished, kept on disk until the run completes so an interrupted
+    run can be resumed. Each line is written and flushed to disk as soon as a file is exported, so a crash loses at most
+    the line being written
+    """
+
+    def __init__(self):
+        self.path = MSFS_MultiExportJournal.get_path()
+        self.recorded = set()
+
+    @staticmethod
+    def get_path():
+        if bpy.data.filepath:
+            return os.path.splitext(bpy.data.filepath)[0] + ".export_journal.jsonl"
+        return os.path.join(bpy.app.tempdir, "export_journal.jsonl")
+
+    @staticmethod
+    def exists():
+        return os.path.isfile(MSFS_MultiExportJournal.get_path())
+
+    def read(self):
+        entries = {}
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Line cut short by a crash
+                    entries[entry["file_path"]] = entry
+        except OSError:
+            pass
+        return entries
+
+    def get_finished_jobs(self, jobs):
+        """
+        Jobs the journal lists as exported, whose output is still on disk and whose fingerprint didn't change since
+        """
+        from .msfs_multi_export_queue import MultiExportQueue
+
+        entries = self.read()
+        finished = []
+        for job in jobs:
+            entry = entries.get(job.file_path)
+            if (
+                entry is not None
+                and job.fingerprint is not None
+                and entry["fingerprint"] == job.fingerprint
+                and MultiExportQueue.get_output_size(job.file_path) == entry["size"]
+            ):
+                finished.append(job)
+        return finished
+
+    def start(self, resume=False):
+        if not resume and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def record(self, job, size):
+        self.recorded.add(job.file_path)
+
+        with open(self.path, "a") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "file_path": job.file_path,
+                        "fingerprint": job.fingerprint,
+                        "size": size,
+                        "timestamp": time.time(),
+                    }
+                )
+                + "\n"
+            )
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
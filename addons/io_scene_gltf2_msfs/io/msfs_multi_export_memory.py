@@ -0,0 +1,68 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import gc
+import bpy
+
+from contextlib import contextmanager
+
+from .msfs_multi_export_profiler import get_memory_usage
+
+
+class MSFS_MemoryLimiter:
+    """
+    Frees what an export left behind after every job, and flags when the process is still above the memory limit
+    so the remaining jobs can be moved to a fresh process
+    """
+
+    # Datablock types the glTF exporter creates temporary data in
+    data_collections = ("meshes", "images", "materials", "node_groups", "textures", "actions")
+
+    def __init__(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.exceeded = False
+
+    @staticmethod
+    def get_data():
+        return {
+            name: set(getattr(bpy.data, name)) for name in MSFS_MemoryLimiter.data_collections
+        }
+
+    @staticmethod
+    def free(data_before, unloaded_images):
+        # Only remove orphans created during the export, never the user's own unused data
+        for name, before in data_before.items():
+            collection = getattr(bpy.data, name)
+            for datablock in list(collection):
+                if datablock not in before and datablock.users == 0:
+                    collection.remove(datablock)
+
+        # Images the export had to load are loaded again on demand if they're needed later
+        for image in unloaded_images:
+            if image.name in bpy.data.images and image.has_data:
+                image.buffers_free()
+
+        gc.collect()
+
+    @contextmanager
+    def active(self, job):
+        data_before = MSFS_MemoryLimiter.get_data()
+        unloaded_images = [image for image in data_before["images"] if not image.has_data]
+        try:
+            yield
+        finally:
+            MSFS_MemoryLimiter.free(data_before, unloaded_images)
+            self.exceeded = get_memory_usage()[0] > self.memory_limit
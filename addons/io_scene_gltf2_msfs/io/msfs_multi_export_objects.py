@@ -17,8 +17,111 @@
 import re
 import os
 import bpy
+import fnmatch
+
+from bpy.app.handlers import persistent
 
 from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+from .msfs_multi_export_planner import MSFS_OT_MultiExportPlan
+from .msfs_multi_export_settings import MSFS_MultiExporterSettings
+
+
+class MultiExporterOverrides(bpy.types.PropertyGroup):
+    """
+    Export settings a LOD or preset can change from the multi-exporter settings, for example to leave tangents and
+    vertex colors out of lower LODs. Defined here so it's registered before the LOD and preset property groups
+    """
+
+    overridable = (
+        "export_texcoords",
+        "export_normals",
+        "export_tangents",
+        "export_colors",
+        "export_materials",
+        "export_image_format",
+        "export_animations",
+        "export_frame_step",
+        "export_skins",
+        "export_all_influences",
+    )
+
+    expanded: bpy.props.BoolProperty(name="", default=False)
+
+    override_export_texcoords: bpy.props.BoolProperty(name="", default=False)
+    override_export_normals: bpy.props.BoolProperty(name="", default=False)
+    override_export_tangents: bpy.props.BoolProperty(name="", default=False)
+    override_export_colors: bpy.props.BoolProperty(name="", default=False)
+    override_export_materials: bpy.props.BoolProperty(name="", default=False)
+    override_export_image_format: bpy.props.BoolProperty(name="", default=False)
+    override_export_animations: bpy.props.BoolProperty(name="", default=False)
+    override_export_frame_step: bpy.props.BoolProperty(name="", default=False)
+    override_export_skins: bpy.props.BoolProperty(name="", default=False)
+    override_export_all_influences: bpy.props.BoolProperty(name="", default=False)
+
+    # Same definitions as the multi-exporter settings
+    export_texcoords: MSFS_MultiExporterSettings.__annotations__["export_texcoords"]
+    export_normals: MSFS_MultiExporterSettings.__annotations__["export_normals"]
+    export_tangents: MSFS_MultiExporterSettings.__annotations__["export_tangents"]
+    export_colors: MSFS_MultiExporterSettings.__annotations__["export_colors"]
+    export_materials: MSFS_MultiExporterSettings.__annotations__["export_materials"]
+    export_image_format: MSFS_MultiExporterSettings.__annotations__["export_image_format"]
+    export_animations: MSFS_MultiExporterSettings.__annotations__["export_animations"]
+    export_frame_step: MSFS_MultiExporterSettings.__annotations__["export_frame_step"]
+    export_skins: MSFS_MultiExporterSettings.__annotations__["export_skins"]
+    export_all_influences: MSFS_MultiExporterSettings.__annotations__["export_all_influences"]
+
+    def apply(self, settings):
+        for name in MultiExporterOverrides.overridable:
+            if getattr(self, "override_" + name):
+                settings[name] = getattr(self, name)
+        return settings
+
+    def draw(self, layout):
+        layout.prop(
+            self,
+            "expanded",
+            text="Overrides",
+            icon="DOWNARROW_HLT" if self.expanded else "RIGHTARROW",
+            emboss=False,
+        )
+        if not self.expanded:
+            return
+
+        col = layout.column(align=True)
+        for name in MultiExporterOverrides.overridable:
+            row = col.row(align=True)
+            row.prop(self, "override_" + name, text="")
+            sub = row.row(align=True)
+            sub.active = getattr(self, "override_" + name)
+            sub.prop(self, name)
+
+
+class MultiExporterNamingScheme(bpy.types.PropertyGroup):
+    def update_scheme(self, context):
+        # Names may belong to other groups now
+        MSFS_LODNaming.invalidate()
+        MSFS_LODGroupIndex.rebuild(context)
+
+    enabled: bpy.props.BoolProperty(name="", default=True, update=update_scheme)
+    scheme_type: bpy.props.EnumProperty(
+        name="",
+        items=(
+            ("PREFIX", "Prefix", "Names start with the prefix, the LOD index and an underscore, like x0_Name"),
+            ("SUFFIX", "Suffix", "Names end with the suffix and the LOD index, like Name_LOD0"),
+            ("REGEX", "Regex", "A regular expression with a group named lod matching the LOD index. "
+             "The group name is what's left of the name without the match"),
+        ),
+        default="SUFFIX",
+        update=update_scheme,
+    )
+    pattern: bpy.props.StringProperty(name="", default="_LOD", update=update_scheme)
+    lod_values: bpy.props.StringProperty(
+        name="LOD Values",
+        description="Comma separated LOD values of LOD 0, 1, 2 and so on, given to LODs when they're found. "
+        "LODs past the end of the list, or all of them if it's empty, get their LOD index",
+        default="",
+        update=update_scheme,
+    )
 
 
 class MultiExporterLOD(bpy.types.PropertyGroup):
@@ -27,50 +130,272 @@ class MultiExporterLOD(bpy.types.PropertyGroup):
 
     enabled: bpy.props.BoolProperty(name="", default=False)
     lod_value: bpy.props.IntProperty(name="", default=0, min=0, max=999)
-    flatten_on_export: bpy.props.BoolProperty(name="", default=False)
-    keep_instances: bpy.props.BoolProperty(name="", default=False)
+    flatten_on_export: bpy.props.BoolProperty(
+        name="",
+        description="Merge static meshes into as few objects as possible when exporting. "
+        "Animated and skinned objects, collision gizmos and objects with behaviors stay separate",
+        default=False,
+    )
+    keep_instances: bpy.props.BoolProperty(
+        name="",
+        description="Export objects sharing the same mesh and materials as one glTF mesh used by several nodes",
+        default=False,
+    )
     file_name: bpy.props.StringProperty(name="", default="")
+    overrides: bpy.props.PointerProperty(type=MultiExporterOverrides)
 
 
 class MultiExporterLODGroup(bpy.types.PropertyGroup):
     group_name: bpy.props.StringProperty(name="", default="")
     expanded: bpy.props.BoolProperty(name="", default=True)
     lods: bpy.props.CollectionProperty(type=MultiExporterLOD)
+    active_lod_index: bpy.props.IntProperty(name="", default=0)
     folder_name: bpy.props.StringProperty(name="", default="", subtype="DIR_PATH")
     generate_xml: bpy.props.BoolProperty(name="", default=False)
     overwrite_guid: bpy.props.BoolProperty(name="", description="If an XML file already exists in the location to export to, the GUID will be overwritten", default=False)
+    guid: bpy.props.StringProperty(name="", description="GUID of the generated XML file, read from an existing file the first time", default="")
+
+    budgets_expanded: bpy.props.BoolProperty(name="", default=False)
+    budget_mode: bpy.props.EnumProperty(
+        name="Over Budget",
+        items=(
+            ("WARN", "Warn", "Export LODs that are over budget and report a warning"),
+            ("FAIL", "Fail", "Fail the export of LODs that are over budget"),
+        ),
+        default="WARN",
+    )
+    budget_triangles: bpy.props.IntProperty(name="Triangles", description="Maximum triangles per LOD, 0 for no limit", default=0, min=0)
+    budget_vertices: bpy.props.IntProperty(name="Vertices", description="Maximum vertices per LOD, 0 for no limit", default=0, min=0)
+    budget_draw_calls: bpy.props.IntProperty(name="Draw Calls", description="Maximum mesh primitives drawn per LOD, 0 for no limit", default=0, min=0)
+    budget_texture_size: bpy.props.FloatProperty(name="Textures (MB)", description="Maximum size of the texture files of a LOD in MB, 0 for no limit", default=0.0, min=0.0)
+    budget_bin_size: bpy.props.FloatProperty(name=".bin (MB)", description="Maximum size of the .bin file of a LOD in MB, 0 for no limit", default=0.0, min=0.0)
+
+    def get_budgets(self):
+        budgets = {
+            "triangles": self.budget_triangles,
+            "vertices": self.budget_vertices,
+            "draw_calls": self.budget_draw_calls,
+            "texture_size": int(self.budget_texture_size * 1024 * 1024),
+            "bin_size": int(self.budget_bin_size * 1024 * 1024),
+        }
+        if not any(budgets.values()):
+            return None
+
+        budgets["mode"] = self.budget_mode
+        return budgets
+
+
+class MSFS_LODNaming:
+    """
+    Parses object and collection names into a LOD group name and LOD index with the naming schemes of the scene. The
+    schemes are compiled once, and parsed names are remembered until the schemes change or the name is renamed away
+    """
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    # Used when the scene has no naming schemes: xN_ or _LODN anywhere in the name, as before naming schemes existed
+    legacy_regex = re.compile("(?i)x[0-9]_|_lod[0-9]+")
+    # The legacy convention as a scheme, the first one added starts from it so adding a scheme keeps the groups.
+    # Like the legacy regex, it matches the last xN_ or _LODN in the name
+    default_scheme = ("REGEX", "(?:(x)(?=[0-9]_)|_LOD)(?P<lod>[0-9]+)(?(1)_)(?!.*(?:x[0-9]_|_LOD[0-9]))", "")
+
+    key = None  # Pointer of the scene the schemes were compiled for
+    schemes = None  # (regex, LOD values) of every enabled scheme, None if the legacy convention is used
+    parsed = {}  # Name -> (group name, LOD index, LOD value), the index and value are None if no scheme matched
+
+    @staticmethod
+    def compile(scheme_type, pattern, lod_values):
+        if scheme_type == "PREFIX":
+            pattern = "^" + re.escape(pattern) + "(?P<lod>[0-9]+)_"
+        elif scheme_type == "SUFFIX":
+            pattern = re.escape(pattern) + "(?P<lod>[0-9]+)$"
+
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            print(f"Ignoring LOD naming scheme {pattern!r}: {e}")
+            return None
+        if "lod" not in regex.groupindex:
+            print(f"Ignoring LOD naming scheme {pattern!r}: it has no group named lod")
+            return None
+
+        values = []
+        for value in lod_values.split(","):
+            try:
+                values.append(int(value))
+            except ValueError:
+                pass
+        return regex, values
+
+    @staticmethod
+    def get_schemes(scene):
+        if MSFS_LODNaming.key != scene.as_pointer():
+            naming_schemes = scene.msfs_multi_exporter_naming_schemes
+            if len(naming_schemes) > 0:
+                compiled = [
+                    MSFS_LODNaming.compile(scheme.scheme_type, scheme.pattern, scheme.lod_values)
+                    for scheme in naming_schemes
+                    if scheme.enabled
+                ]
+                MSFS_LODNaming.schemes = [scheme for scheme in compiled if scheme is not None]
+            else:
+                MSFS_LODNaming.schemes = None
+            MSFS_LODNaming.parsed = {}
+            MSFS_LODNaming.key = scene.as_pointer()
+        return MSFS_LODNaming.schemes
+
+    @staticmethod
+    def parse(name, scene=None):
+        schemes = MSFS_LODNaming.get_schemes(bpy.context.scene if scene is None else scene)
+
+        result = MSFS_LODNaming.parsed.get(name)
+        if result is None and schemes is None:
+            result = MSFS_LODNaming.parse_legacy(name)
+            MSFS_LODNaming.parsed[name] = result
+        elif result is None:
+            # If no scheme matches, use the name as the group
+            result = (name, None, None)
+            for regex, lod_values in schemes:
+                match = regex.search(name)
+                if match is None or match.group("lod") is None or not match.group("lod").isdigit():
+                    continue
+
+                lod_index = int(match.group("lod"))
+                lod_value = lod_values[lod_index] if lod_index < len(lod_values) else lod_index
+                result = (name[: match.start()] + name[match.end() :], lod_index, min(max(lod_value, 0), 999))
+                break
+
+            MSFS_LODNaming.parsed[name] = result
+        return result
+
+    @staticmethod
+    def parse_legacy(name):
+        # Same groups as before naming schemes existed, which removed every occurrence of the last match. LOD values
+        # are left alone, as they were then
+        matches = MSFS_LODNaming.legacy_regex.findall(name)
+        if not matches:
+            return (name, None, None)
+
+        lod_index = int("".join(c for c in matches[-1] if c.isdigit()))
+        return (name.replace(matches[-1], ""), lod_index, None)
+
+    @staticmethod
+    def forget(name):
+        MSFS_LODNaming.parsed.pop(name, None)
+
+    @staticmethod
+    def invalidate():
+        MSFS_LODNaming.key = None
+        MSFS_LODNaming.schemes = None
+        MSFS_LODNaming.parsed = {}
 
 
 class MSFS_LODGroupUtility:
+    # Built once per view layer and cleared by depsgraph updates that can change it. Only the structure is cached,
+    # visibility itself is read from the LayerCollections and objects, so hiding something needs no update
+    cache_key = None  # (view layer pointer, number of collections) the cache was built for
+    layer_collection_paths = {}  # Full collection name -> child indices leading to its LayerCollection
+    view_layer_objects = set()
+
+    @staticmethod
+    def invalidate():
+        MSFS_LODGroupUtility.cache_key = None
+        MSFS_LODGroupUtility.layer_collection_paths = {}
+        MSFS_LODGroupUtility.view_layer_objects = set()
+
+    @staticmethod
+    def update_cache(context):
+        view_layer = context.view_layer
+        cache_key = (view_layer.as_pointer(), len(bpy.data.collections))
+        if MSFS_LODGroupUtility.cache_key == cache_key:
+            return
+
+        # Checking visibility from the collection itself won't work, so we have to find the LayerCollection of every
+        # collection, including nested ones. Only their paths are kept, LayerCollections can be freed by an edit
+        layer_collection_paths = {}
+        stack = [(view_layer.layer_collection, ())]
+        while stack:
+            layer_collection, path = stack.pop()
+            layer_collection_paths[layer_collection.collection.name_full] = path
+            stack.extend((child, path + (i,)) for i, child in enumerate(layer_collection.children))
+
+        MSFS_LODGroupUtility.layer_collection_paths = layer_collection_paths
+        MSFS_LODGroupUtility.view_layer_objects = set(view_layer.objects)
+        MSFS_LODGroupUtility.cache_key = cache_key
+
+    @staticmethod
+    def find_layer_collection(context, path):
+        layer_collection = context.view_layer.layer_collection
+        for i in path:
+            if i >= len(layer_collection.children):
+                return None
+            layer_collection = layer_collection.children[i]
+        return layer_collection
+
+    @staticmethod
+    def get_layer_collection(context, collection):
+        """
+        The LayerCollection of a collection, looked up on every call so it's never one that was freed
+        """
+        path = MSFS_LODGroupUtility.layer_collection_paths.get(collection.name_full)
+        if path is None:
+            return None  # Not in the view layer
+
+        layer_collection = MSFS_LODGroupUtility.find_layer_collection(context, path)
+        if layer_collection is None or layer_collection.collection != collection:
+            # The collections changed without a depsgraph update
+            MSFS_LODGroupUtility.invalidate()
+            MSFS_LODGroupUtility.update_cache(context)
+            path = MSFS_LODGroupUtility.layer_collection_paths.get(collection.name_full)
+            layer_collection = MSFS_LODGroupUtility.find_layer_collection(context, path) if path is not None else None
+        return layer_collection
+
+    @staticmethod
+    def get_lod_name(context, lod):
+        lod_id = lod.collection if context.scene.multi_exporter_grouped_by_collections else lod.object
+        return lod_id.name if lod_id is not None else ""
+
+    @staticmethod
+    def filter_list(ui_list, names, visible):
+        """
+        Returns the filter flags and order of a UIList's items from their names and whether they're shown at all, using
+        the name filter and sorting options of the list
+        """
+        pattern = None
+        if ui_list.filter_name:
+            pattern = re.compile(fnmatch.translate(f"*{ui_list.filter_name}*"), re.IGNORECASE)
+
+        flags = []
+        for name, is_visible in zip(names, visible):
+            matches = pattern is None or (pattern.match(name) is not None) != ui_list.use_filter_invert
+            flags.append(ui_list.bitflag_filter_item if is_visible and matches else 0)
+
+        order = []
+        if ui_list.use_filter_sort_alpha:
+            order = [0] * len(names)
+            for position, i in enumerate(sorted(range(len(names)), key=lambda i: names[i].lower())):
+                order[i] = position
+
+        return flags, order
+
     @staticmethod
     def lod_is_visible(context, lod):
-        sort_by_collection = context.scene.multi_exporter_grouped_by_collections
+        MSFS_LODGroupUtility.update_cache(context)
+        show_hidden_objects = context.scene.multi_exporter_show_hidden_objects
 
-        if sort_by_collection:
-            # Checking visibility from the collection itself won't work, so we have to find the LayerCollection that contains our collection.
-            collection_hidden = False
-            for (
-                layer_collection
-            ) in bpy.context.window.view_layer.layer_collection.children:
-                if layer_collection.collection == lod.collection:
-                    collection_hidden = not layer_collection.visible_get()
-
-            if (
-                not context.scene.multi_exporter_show_hidden_objects
-                and collection_hidden
-            ) or (
-                lod.collection is None
-                or lod.collection not in list(bpy.data.collections)
-            ):
+        if context.scene.multi_exporter_grouped_by_collections:
+            if lod.collection is None:
+                return False
+
+            layer_collection = MSFS_LODGroupUtility.get_layer_collection(context, lod.collection)
+            if not show_hidden_objects and layer_collection is not None and not layer_collection.visible_get():
                 return False
         else:
-            if (
-                not context.scene.multi_exporter_show_hidden_objects
-                and lod.object.hide_get()
-            ) or (
-                lod.object is None
-                or lod.object not in list(bpy.context.window.view_layer.objects)
-            ):
+            if lod.object is None or lod.object not in MSFS_LODGroupUtility.view_layer_objects:
+                return False
+
+            if not show_hidden_objects and lod.object.hide_get():
                 return False
         return True
 
@@ -82,25 +407,24 @@ class MSFS_OT_ReloadLODGroups(bpy.types.Operator):
     @staticmethod
     def update_grouped_by(self, context):
         context.scene.msfs_multi_exporter_lod_groups.clear()
-        MSFS_OT_ReloadLODGroups.reload_lod_groups(self, context)
+        MSFS_LODGroupIndex.rebuild(context)
 
     @staticmethod
-    def get_group_from_name(name):
-        matches = re.findall(
-            "(?i)x[0-9]_|_lod[0-9]+", name
-        )  # If an object starts with xN_ or ends with _LODN, treat as an LOD
-        if matches:
-            # Get base object group name from object
-            for match in matches:
-                filtered_string = name.replace(match, "")
-            return filtered_string
-        else:
-            # If prefix or suffix isn't found, use the object name as the group
-            return name
+    def get_group_from_name(name, scene=None):
+        return MSFS_LODNaming.parse(name, scene)[0]
 
     @staticmethod
-    def get_lod_group_names(lod_groups):
-        return [lod_group.group_name for lod_group in lod_groups]
+    def init_lod(lod, lod_id, scene):
+        if scene.multi_exporter_grouped_by_collections:
+            lod.collection = lod_id
+        else:
+            lod.object = lod_id
+        lod.file_name = lod_id.name
+
+        # LODs found by a naming scheme get the LOD value of their index
+        lod_value = MSFS_LODNaming.parse(lod_id.name, scene)[2]
+        if lod_value is not None:
+            lod.lod_value = lod_value
 
     @staticmethod
     def reload_lod_groups(self, context):
@@ -108,82 +432,333 @@ class MSFS_OT_ReloadLODGroups(bpy.types.Operator):
 
         sort_by_collection = context.scene.multi_exporter_grouped_by_collections
 
-        # Remove deleted LODs
-        for i, lod_group in enumerate(lod_groups):
-            for j, lod in enumerate(lod_group.lods):
-                if sort_by_collection:
-                    if (
-                        not lod.collection in list(bpy.data.collections)
-                        or not MSFS_OT_ReloadLODGroups.get_group_from_name(
-                            lod.collection.name
-                        )
-                        == lod_group.group_name
-                    ):
-                        lod_groups[i].lods.remove(j)
-                        continue
+        # Search for LODs, by the group their name puts them in
+        if sort_by_collection:
+            candidates = bpy.data.collections
+        else:
+            candidates = [obj for obj in context.scene.objects if obj.parent is None]
+
+        found_lods = {}
+        found_lod_groups = {}
+        for candidate in candidates:
+            group_name = MSFS_OT_ReloadLODGroups.get_group_from_name(candidate.name, context.scene)
+            found_lods[candidate] = group_name
+            found_lod_groups.setdefault(group_name, []).append(candidate)
+
+        # Remove deleted LODs and LODs that belong to another group now.
+        # Backwards, so removing an item doesn't skip the one after it
+        existing_lods = set()
+        for i in reversed(range(len(lod_groups))):
+            lod_group = lod_groups[i]
+            for j in reversed(range(len(lod_group.lods))):
+                lod = lod_group.lods[j]
+                lod_id = lod.collection if sort_by_collection else lod.object
+                if lod_id is None or found_lods.get(lod_id) != lod_group.group_name or lod_id in existing_lods:
+                    lod_group.lods.remove(j)
                 else:
-                    if (
-                        not lod.object in list(context.scene.objects)
-                        or not MSFS_OT_ReloadLODGroups.get_group_from_name(
-                            lod.object.name
-                        )
-                        == lod_group.group_name
-                    ):
-                        lod_groups[i].lods.remove(j)
-                        continue
+                    existing_lods.add(lod_id)
 
             if len(lod_group.lods) == 0:
                 lod_groups.remove(i)
 
-        # Search for new groups
-        found_lod_groups = {}
-        if sort_by_collection:
-            for collection in bpy.data.collections:
-                lod_group = MSFS_OT_ReloadLODGroups.get_group_from_name(collection.name)
-                if lod_group not in found_lod_groups:
-                    found_lod_groups[lod_group] = []
-                found_lod_groups[lod_group].append(collection)
-        else:
-            for object in context.scene.objects:
-                if object.parent is None:
-                    lod_group = MSFS_OT_ReloadLODGroups.get_group_from_name(object.name)
-                    if lod_group not in found_lod_groups:
-                        found_lod_groups[lod_group] = []
-                    found_lod_groups[lod_group].append(object)
-
         # Add to object groups
-        for lod_group in found_lod_groups:
-            if lod_group not in MSFS_OT_ReloadLODGroups.get_lod_group_names(lod_groups):
+        lod_group_indices = {lod_group.group_name: i for i, lod_group in enumerate(lod_groups)}
+        for group_name, lod_ids in found_lod_groups.items():
+            lod_group_index = lod_group_indices.get(group_name)
+            if lod_group_index is None:
                 # Create LOD group
                 created_lod_group = lod_groups.add()
-                created_lod_group.group_name = lod_group
-
-            lod_group_index = MSFS_OT_ReloadLODGroups.get_lod_group_names(
-                lod_groups
-            ).index(lod_group)
-
-            if sort_by_collection:
-                for collection in found_lod_groups[lod_group]:
-                    if collection not in [
-                        lod.collection for lod in lod_groups[lod_group_index].lods
-                    ]:
-                        lod = lod_groups[lod_group_index].lods.add()
-                        lod.collection = collection
-                        lod.file_name = collection.name
-            else:
-                for obj in found_lod_groups[lod_group]:
-                    if obj not in [
-                        lod.object for lod in lod_groups[lod_group_index].lods
-                    ]:
-                        lod = lod_groups[lod_group_index].lods.add()
-                        lod.object = obj
-                        lod.file_name = obj.name
+                created_lod_group.group_name = group_name
+                lod_group_index = lod_group_indices[group_name] = len(lod_groups) - 1
+
+            lods = lod_groups[lod_group_index].lods
+            for lod_id in lod_ids:
+                if lod_id in existing_lods:
+                    continue
+
+                MSFS_OT_ReloadLODGroups.init_lod(lods.add(), lod_id, context.scene)
+
+    def execute(self, context):
+        MSFS_LODGroupIndex.rebuild(context)
+        return {"FINISHED"}
+
+
+class MSFS_OT_AddNamingScheme(bpy.types.Operator):
+    bl_idname = "msfs.multi_export_add_naming_scheme"
+    bl_label = "Add naming scheme"
+
+    def execute(self, context):
+        naming_schemes = context.scene.msfs_multi_exporter_naming_schemes
+        scheme = naming_schemes.add()
+        if len(naming_schemes) == 1:
+            # Start from the convention used so far, so adding a scheme doesn't change the groups
+            scheme.scheme_type, scheme.pattern, scheme.lod_values = MSFS_LODNaming.default_scheme
+
+        MSFS_LODNaming.invalidate()
+        MSFS_LODGroupIndex.rebuild(context)
+        return {"FINISHED"}
+
+
+class MSFS_OT_RemoveNamingScheme(bpy.types.Operator):
+    bl_idname = "msfs.multi_export_remove_naming_scheme"
+    bl_label = "Remove naming scheme"
+
+    scheme_index: bpy.props.IntProperty()
+
+    def execute(self, context):
+        context.scene.msfs_multi_exporter_naming_schemes.remove(self.scheme_index)
+
+        MSFS_LODNaming.invalidate()
+        MSFS_LODGroupIndex.rebuild(context)
+        return {"FINISHED"}
+
+
+class MSFS_LODGroupIndex:
+    """
+    Keeps the LOD groups of the scene current as objects or collections are added, renamed, reparented or deleted, so
+    the Objects tab doesn't need a reload. Only the IDs reported by a depsgraph update are looked at, the LOD groups
+    are scanned again when something was deleted
+    """
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    updating = False  # Set while the LOD groups are patched, so the updates that causes are ignored
+    key = None  # Scene pointer and grouping the entries were built for
+    entries = {}  # Pointer of every LOD object or collection -> (name, group name) when it was indexed
+    counts = (0, 0)  # Objects in the scene and collections in the file, to notice deletions
+    scene_objects = None  # Objects of the scene, built at most once per update when needed
+
+    @staticmethod
+    def get_key(scene):
+        return (scene.as_pointer(), scene.multi_exporter_grouped_by_collections)
+
+    @staticmethod
+    def get_lod_id(lod, sort_by_collection):
+        return lod.collection if sort_by_collection else lod.object
+
+    @staticmethod
+    def get_counts(scene):
+        return (len(scene.objects), len(bpy.data.collections))
+
+    @staticmethod
+    def invalidate(*args):
+        MSFS_LODGroupIndex.key = None
+        MSFS_LODGroupIndex.entries = {}
+
+    @staticmethod
+    def snapshot(scene):
+        sort_by_collection = scene.multi_exporter_grouped_by_collections
+
+        entries = {}
+        for lod_group in scene.msfs_multi_exporter_lod_groups:
+            for lod in lod_group.lods:
+                lod_id = MSFS_LODGroupIndex.get_lod_id(lod, sort_by_collection)
+                if lod_id is not None:
+                    entries[lod_id.as_pointer()] = (lod_id.name, lod_group.group_name)
+
+        MSFS_LODGroupIndex.entries = entries
+        MSFS_LODGroupIndex.key = MSFS_LODGroupIndex.get_key(scene)
+        MSFS_LODGroupIndex.counts = MSFS_LODGroupIndex.get_counts(scene)
+
+    @staticmethod
+    def rebuild(context):
+        MSFS_LODGroupIndex.updating = True
+        try:
+            MSFS_OT_ReloadLODGroups.reload_lod_groups(None, context)
+        finally:
+            MSFS_LODGroupIndex.updating = False
+        MSFS_LODGroupIndex.snapshot(context.scene)
+
+    @staticmethod
+    def is_lod(scene, id):
+        if scene.multi_exporter_grouped_by_collections:
+            return isinstance(id, bpy.types.Collection)
+        if not isinstance(id, bpy.types.Object) or id.parent is not None:
+            return False
+        if MSFS_LODGroupIndex.scene_objects is None:
+            MSFS_LODGroupIndex.scene_objects = set(scene.objects)
+        return id in MSFS_LODGroupIndex.scene_objects
+
+    @staticmethod
+    def add(scene, id):
+        lod_groups = scene.msfs_multi_exporter_lod_groups
+        group_name = MSFS_OT_ReloadLODGroups.get_group_from_name(id.name, scene)
+
+        lod_group = next((lod_group for lod_group in lod_groups if lod_group.group_name == group_name), None)
+        if lod_group is None:
+            lod_group = lod_groups.add()
+            lod_group.group_name = group_name
+
+        MSFS_OT_ReloadLODGroups.init_lod(lod_group.lods.add(), id, scene)
+
+        MSFS_LODGroupIndex.entries[id.as_pointer()] = (id.name, group_name)
+
+    @staticmethod
+    def remove(scene, pointer):
+        sort_by_collection = scene.multi_exporter_grouped_by_collections
+        lod_groups = scene.msfs_multi_exporter_lod_groups
+        _, group_name = MSFS_LODGroupIndex.entries.pop(pointer)
+
+        for i, lod_group in enumerate(lod_groups):
+            if lod_group.group_name != group_name:
+                continue
+
+            for j, lod in enumerate(lod_group.lods):
+                lod_id = MSFS_LODGroupIndex.get_lod_id(lod, sort_by_collection)
+                if lod_id is not None and lod_id.as_pointer() == pointer:
+                    lod_group.lods.remove(j)
+                    break
+
+            if len(lod_group.lods) == 0:
+                lod_groups.remove(i)
+            return
+
+    @staticmethod
+    def prune(scene):
+        """
+        Removes the LODs whose object or collection was deleted, or no longer is a LOD
+        """
+        sort_by_collection = scene.multi_exporter_grouped_by_collections
+        lod_groups = scene.msfs_multi_exporter_lod_groups
+
+        # Backwards, so removing an item doesn't shift the ones still to be checked
+        for i in reversed(range(len(lod_groups))):
+            lods = lod_groups[i].lods
+            for j in reversed(range(len(lods))):
+                lod_id = MSFS_LODGroupIndex.get_lod_id(lods[j], sort_by_collection)
+                if lod_id is None or not MSFS_LODGroupIndex.is_lod(scene, lod_id):
+                    lods.remove(j)
+            if len(lods) == 0:
+                lod_groups.remove(i)
+
+        MSFS_LODGroupIndex.snapshot(scene)
+
+    @staticmethod
+    def patch(scene, id):
+        pointer = id.as_pointer()
+        entry = MSFS_LODGroupIndex.entries.get(pointer)
+
+        # Most updates are LODs being moved or edited, which only needs a lookup. Objects unlinked from the scene lower
+        # the object count, and are removed by prune
+        if (
+            entry is not None
+            and entry[0] == id.name
+            and (isinstance(id, bpy.types.Collection) or id.parent is None)
+        ):
+            return
+
+        is_lod = MSFS_LODGroupIndex.is_lod(scene, id)
+        if entry is not None:
+            name, group_name = entry
+            if is_lod and name == id.name:
+                return
+            if name != id.name:
+                MSFS_LODNaming.forget(name)
+            if is_lod and MSFS_OT_ReloadLODGroups.get_group_from_name(id.name, scene) == group_name:
+                # Renamed within the same group, the LOD keeps its settings
+                MSFS_LODGroupIndex.entries[pointer] = (id.name, group_name)
+                return
+            MSFS_LODGroupIndex.remove(scene, pointer)
+
+        if is_lod:
+            MSFS_LODGroupIndex.add(scene, id)
+
+    @staticmethod
+    def update(scene, depsgraph):
+        if MSFS_LODGroupIndex.updating or not scene.msfs_exporter_properties.enabled:
+            return
+
+        MSFS_LODGroupIndex.updating = True
+        MSFS_LODGroupIndex.scene_objects = None
+        try:
+            if MSFS_LODGroupIndex.key != MSFS_LODGroupIndex.get_key(scene):
+                # First update of this scene or grouping, or after an undo replaced every ID
+                if bpy.context.scene == scene:
+                    MSFS_OT_ReloadLODGroups.reload_lod_groups(None, bpy.context)
+                MSFS_LODGroupIndex.snapshot(scene)
+                return
+
+            id_type = bpy.types.Collection if scene.multi_exporter_grouped_by_collections else bpy.types.Object
+            for update in depsgraph.updates:
+                id = update.id.original
+                if isinstance(id, id_type):
+                    MSFS_LODGroupIndex.patch(scene, id)
+
+            counts = MSFS_LODGroupIndex.get_counts(scene)
+            if any(count < previous for count, previous in zip(counts, MSFS_LODGroupIndex.counts)):
+                MSFS_LODGroupIndex.prune(scene)
+            MSFS_LODGroupIndex.counts = counts
+        finally:
+            MSFS_LODGroupIndex.updating = False
+            MSFS_LODGroupIndex.scene_objects = None
+
+
+class MSFS_OT_ToggleLODs(bpy.types.Operator):
+    bl_idname = "msfs.multi_export_toggle_lods"
+    bl_label = "Enable or disable LODs"
+    bl_description = "Enable or disable every shown LOD whose name matches a pattern"
+    bl_options = {"REGISTER", "UNDO"}
+
+    pattern: bpy.props.StringProperty(
+        name="Pattern",
+        description="Names of the LODs to change, * matches any text and ? any character. Not case sensitive",
+        default="*",
+    )
+    enable: bpy.props.BoolProperty(name="Enable", default=True)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
 
     def execute(self, context):
-        MSFS_OT_ReloadLODGroups.reload_lod_groups(self, context)
+        pattern = re.compile(fnmatch.translate(self.pattern), re.IGNORECASE)
+
+        count = 0
+        for lod_group in context.scene.msfs_multi_exporter_lod_groups:
+            for lod in lod_group.lods:
+                if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
+                    continue
+                if pattern.match(MSFS_LODGroupUtility.get_lod_name(context, lod)):
+                    lod.enabled = self.enable
+                    count += 1
+
+        self.report({"INFO"}, f"{'Enabled' if self.enable else 'Disabled'} {count} LODs")
         return {"FINISHED"}
 
 
+class MSFS_UL_MultiExporterLODGroups(bpy.types.UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row()
+        row.label(text=item.group_name)
+        row.label(text=f"{sum(lod.enabled for lod in item.lods)}/{len(item.lods)} enabled")
+
+    def filter_items(self, context, data, propname):
+        lod_groups = getattr(data, propname)
+        # Groups without any LOD that's shown aren't listed
+        visible = [
+            any(MSFS_LODGroupUtility.lod_is_visible(context, lod) for lod in lod_group.lods)
+            for lod_group in lod_groups
+        ]
+        return MSFS_LODGroupUtility.filter_list(
+            self, [lod_group.group_name for lod_group in lod_groups], visible
+        )
+
+
+class MSFS_UL_MultiExporterLODs(bpy.types.UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row()
+        row.prop(item, "enabled", text=MSFS_LODGroupUtility.get_lod_name(context, item))
+        row.prop(item, "lod_value", text="LOD Value")
+
+    def filter_items(self, context, data, propname):
+        lods = getattr(data, propname)
+        return MSFS_LODGroupUtility.filter_list(
+            self,
+            [MSFS_LODGroupUtility.get_lod_name(context, lod) for lod in lods],
+            [MSFS_LODGroupUtility.lod_is_visible(context, lod) for lod in lods],
+        )
+
+
 class MSFS_PT_MultiExporterObjectsView(bpy.types.Panel):
     bl_label = ""
     bl_parent_id = "MSFS_PT_MultiExporter"
@@ -203,73 +778,143 @@ class MSFS_PT_MultiExporterObjectsView(bpy.types.Panel):
         layout.prop(context.scene, "multi_exporter_show_hidden_objects")
         layout.prop(context.scene, "multi_exporter_grouped_by_collections")
 
-        lod_groups = context.scene.msfs_multi_exporter_lod_groups
-        sort_by_collection = context.scene.multi_exporter_grouped_by_collections
+        box = layout.box()
+        box.prop(
+            context.scene,
+            "multi_exporter_naming_expanded",
+            text="Naming Schemes",
+            icon="DOWNARROW_HLT" if context.scene.multi_exporter_naming_expanded else "RIGHTARROW",
+            emboss=False,
+        )
+        if context.scene.multi_exporter_naming_expanded:
+            naming_schemes = context.scene.msfs_multi_exporter_naming_schemes
+            if len(naming_schemes) == 0:
+                box.label(text="Using x0_ or _LOD0 anywhere in the name")
+            for i, scheme in enumerate(naming_schemes):
+                col = box.column(align=True)
+                row = col.row(align=True)
+                row.prop(scheme, "enabled")
+                row.prop(scheme, "scheme_type")
+                row.prop(scheme, "pattern")
+                row.operator(MSFS_OT_RemoveNamingScheme.bl_idname, text="", icon="X").scheme_index = i
+                col.prop(scheme, "lod_values")
+            box.operator(MSFS_OT_AddNamingScheme.bl_idname, text="Add Naming Scheme")
 
-        total_lods = 0
-        for lod_group in lod_groups:
-            for lod in lod_group.lods:
-                if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
-                    continue
-
-                total_lods += 1
+        lod_groups = context.scene.msfs_multi_exporter_lod_groups
 
-        if total_lods == 0:
+        if not any(
+            MSFS_LODGroupUtility.lod_is_visible(context, lod)
+            for lod_group in lod_groups
+            for lod in lod_group.lods
+        ):
             box = layout.box()
             box.label(text="No LODs found in scene")
         else:
-            for lod_group in lod_groups:
-                if (
-                    len(lod_group.lods) == 1
-                ):  # If we only have one LOD in the group, and it is hidden, then don't render the group
-                    if not MSFS_LODGroupUtility.lod_is_visible(
-                        context, lod_group.lods[0]
-                    ):
-                        continue
-
-                if len(lod_group.lods) > 0:
-                    row = layout.row()
-
-                    box = row.box()
+            # Lists only draw the rows that are scrolled into view
+            layout.template_list(
+                MSFS_UL_MultiExporterLODGroups.__name__,
+                "",
+                context.scene,
+                "msfs_multi_exporter_lod_groups",
+                context.scene,
+                "msfs_multi_exporter_lod_group_index",
+                rows=8,
+            )
+
+            row = layout.row(align=True)
+            row.operator(MSFS_OT_ToggleLODs.bl_idname, text="Enable Matching", icon="CHECKBOX_HLT").enable = True
+            row.operator(MSFS_OT_ToggleLODs.bl_idname, text="Disable Matching", icon="CHECKBOX_DEHLT").enable = False
+
+            lod_group_index = context.scene.msfs_multi_exporter_lod_group_index
+            if 0 <= lod_group_index < len(lod_groups):
+                lod_group = lod_groups[lod_group_index]
+
+                box = layout.box()
+                box.prop(
+                    lod_group,
+                    "expanded",
+                    text=lod_group.group_name,
+                    icon="DOWNARROW_HLT" if lod_group.expanded else "RIGHTARROW",
+                    emboss=False,
+                )
+                if lod_group.expanded:
+                    box.prop(lod_group, "generate_xml", text="Generate XML")
+                    if lod_group.generate_xml:
+                        box.prop(lod_group, "overwrite_guid", text="Overwrite GUID")
+
+                    box.prop(lod_group, "folder_name", text="Folder")
+
                     box.prop(
                         lod_group,
-                        "expanded",
-                        text=lod_group.group_name,
-                        icon="DOWNARROW_HLT" if lod_group.expanded else "RIGHTARROW",
-                        icon_only=True,
+                        "budgets_expanded",
+                        text="Budgets",
+                        icon="DOWNARROW_HLT" if lod_group.budgets_expanded else "RIGHTARROW",
                         emboss=False,
                     )
-                    if lod_group.expanded:
-                        box.prop(lod_group, "generate_xml", text="Generate XML")
-                        if lod_group.generate_xml:
-                            box.prop(lod_group, "overwrite_guid", text="Overwrite GUID")
-
-                        box.prop(lod_group, "folder_name", text="Folder")
-
-                        col = box.column()
-                        for lod in lod_group.lods:
-                            if not MSFS_LODGroupUtility.lod_is_visible(context, lod):
-                                continue
-
-                            row = col.row()
-                            if sort_by_collection:
-                                row.prop(lod, "enabled", text=lod.collection.name)
-                            else:
-                                row.prop(lod, "enabled", text=lod.object.name)
-                            subrow = row.column()
-                            subrow.prop(lod, "lod_value", text="LOD Value")
-                            # subrow.prop(lod, "flatten_on_export", text="Flatten on Export") # Disable these two options for now as there's not a great way to implement them
-                            # subrow.prop(lod, "keep_instances", text="Keep Instances")
-                            subrow.prop(lod, "file_name", text="File Name")
+                    if lod_group.budgets_expanded:
+                        budgets_col = box.column(align=True)
+                        budgets_col.prop(lod_group, "budget_mode")
+                        budgets_col.prop(lod_group, "budget_triangles")
+                        budgets_col.prop(lod_group, "budget_vertices")
+                        budgets_col.prop(lod_group, "budget_draw_calls")
+                        budgets_col.prop(lod_group, "budget_texture_size")
+                        budgets_col.prop(lod_group, "budget_bin_size")
+
+                    box.template_list(
+                        MSFS_UL_MultiExporterLODs.__name__,
+                        "",
+                        lod_group,
+                        "lods",
+                        lod_group,
+                        "active_lod_index",
+                        rows=4,
+                    )
+
+                    lod_index = lod_group.active_lod_index
+                    if 0 <= lod_index < len(lod_group.lods):
+                        lod = lod_group.lods[lod_index]
+                        if MSFS_LODGroupUtility.lod_is_visible(context, lod):
+                            col = box.column()
+                            col.prop(lod, "lod_value", text="LOD Value")
+                            col.prop(lod, "flatten_on_export", text="Flatten on Export")
+                            col.prop(lod, "keep_instances", text="Keep Instances")
+                            col.prop(lod, "file_name", text="File Name")
+                            lod.overrides.draw(col)
 
         row = layout.row(align=True)
         row.operator(MSFS_OT_MultiExportGLTF2.bl_idname, text="Export")
+        row.operator(MSFS_OT_MultiExportPlan.bl_idname, text="Plan")
+
+
+@persistent
+def lod_group_index_update(scene, depsgraph):
+    # Linking objects and collections or excluding collections updates these, moving objects doesn't
+    if depsgraph.id_type_updated("COLLECTION") or depsgraph.id_type_updated("SCENE"):
+        MSFS_LODGroupUtility.invalidate()
+    MSFS_LODGroupIndex.update(scene, depsgraph)
+
+
+@persistent
+def lod_group_index_invalidate(*args):
+    # Naming schemes can change with an undo too, without their update callback
+    MSFS_LODNaming.invalidate()
+    MSFS_LODGroupUtility.invalidate()
+    MSFS_LODGroupIndex.invalidate()
 
 
 def register():
     bpy.types.Scene.msfs_multi_exporter_lod_groups = bpy.props.CollectionProperty(
         type=MultiExporterLODGroup
     )
+    bpy.types.Scene.msfs_multi_exporter_lod_group_index = bpy.props.IntProperty(
+        name="", default=0
+    )
+    bpy.types.Scene.msfs_multi_exporter_naming_schemes = bpy.props.CollectionProperty(
+        type=MultiExporterNamingScheme
+    )
+    bpy.types.Scene.multi_exporter_naming_expanded = bpy.props.BoolProperty(
+        name="", default=False
+    )
     bpy.types.Scene.multi_exporter_show_hidden_objects = bpy.props.BoolProperty(
         name="Show hidden objects", default=True
     )
@@ -278,3 +923,18 @@ def register():
         default=False,
         update=MSFS_OT_ReloadLODGroups.update_grouped_by,
     )
+
+    for handler_list in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if lod_group_index_invalidate not in handler_list:
+            handler_list.append(lod_group_index_invalidate)
+    if lod_group_index_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(lod_group_index_update)
+
+
+def unregister():
+    for handler_list in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if lod_group_index_invalidate in handler_list:
+            handler_list.remove(lod_group_index_invalidate)
+    if lod_group_index_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(lod_group_index_update)
+    lod_group_index_invalidate()
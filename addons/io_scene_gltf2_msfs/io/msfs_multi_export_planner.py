@@ -0,0 +1,246 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import bpy
+import numpy as np
+
+from .msfs_multi_export_cache import MSFS_ExportFingerprint, MSFS_MultiExportCache
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_duration(duration):
+    if duration is None:
+        return "unknown"
+    minutes, seconds = divmod(int(round(duration)), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+class MultiExportEstimate:
+    def __init__(self, job):
+        self.job = job
+        self.objects = 0
+        self.vertices = 0
+        self.triangles = 0
+        self.materials = set()
+        self.images = set()
+        self.geometry_size = 0
+        self.image_size = 0
+        self.duration = None
+        self.unchanged = False
+
+    @property
+    def size(self):
+        return self.geometry_size + self.image_size
+
+
+class MSFS_MultiExportPlanner:
+    """
+    Estimates the output of an export plan without exporting anything
+    """
+
+    # Rough size of the glTF JSON for each node
+    node_size = 256
+
+    def __init__(self, context, cache=None):
+        self.depsgraph = context.evaluated_depsgraph_get()
+        self.cache = cache if cache is not None else MSFS_MultiExportCache()
+        self.image_sizes = {}
+        self.mesh_counts = {}
+
+    @staticmethod
+    def get_material_images(material):
+        images = set()
+
+        def add_node_tree(node_tree):
+            if node_tree is None:
+                return
+            for node in node_tree.nodes:
+                if node.bl_idname == "ShaderNodeTexImage" and node.image is not None:
+                    images.add(node.image)
+                elif node.bl_idname == "ShaderNodeGroup":
+                    add_node_tree(node.node_tree)
+
+        if material.use_nodes:
+            add_node_tree(material.node_tree)
+        return images
+
+    def get_image_size(self, image, settings):
+        if image not in self.image_sizes:
+            file_path = bpy.path.abspath(image.filepath_raw, library=image.library)
+            if image.packed_file is not None:
+                size = image.packed_file.size
+            elif os.path.isfile(file_path):
+                size = os.path.getsize(file_path)
+            else:
+                # Assume the encoded image is about half the size of the raw RGBA pixels
+                size = image.size[0] * image.size[1] * 2
+
+            if settings.get("export_image_format") == "NONE":
+                size = 0
+            self.image_sizes[image] = size
+        return self.image_sizes[image]
+
+    @staticmethod
+    def get_vertex_size(mesh, settings):
+        size = 12  # Position
+        if settings.get("export_normals", True):
+            size += 12
+            if settings.get("export_tangents", False):
+                size += 16
+        if settings.get("export_texcoords", True):
+            size += 8 * len(mesh.uv_layers)
+        if settings.get("export_colors", True):
+            size += 16 * len(mesh.vertex_colors)
+        if mesh.shape_keys is not None:
+            size += 24 * (len(mesh.shape_keys.key_blocks) - 1)
+        return size
+
+    def get_mesh_counts(self, obj, settings):
+        """
+        Returns (vertices, triangles, geometry size) of an object, counting split vertices as the glTF exporter writes them
+        """
+        if settings.get("export_apply", False):
+            obj = obj.evaluated_get(self.depsgraph)
+
+        mesh = obj.data
+        if mesh not in self.mesh_counts:
+            loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.polygons.foreach_get("loop_total", loop_totals)
+
+            triangles = int(np.sum(loop_totals - 2))
+            # The exporter splits vertices with different normals or UVs, so loops are an upper bound
+            vertices = len(mesh.loops)
+            index_size = 2 if vertices < 65536 else 4
+
+            geometry_size = (
+                vertices * MSFS_MultiExportPlanner.get_vertex_size(mesh, settings)
+                + triangles * 3 * index_size
+            )
+            self.mesh_counts[mesh] = (len(mesh.vertices), triangles, geometry_size)
+        return self.mesh_counts[mesh]
+
+    def estimate(self, job, fingerprint=None):
+        estimate = MultiExportEstimate(job)
+
+        for name in job.objects:
+            obj = bpy.data.objects.get(name)
+            if obj is None:
+                continue
+
+            estimate.objects += 1
+            estimate.geometry_size += MSFS_MultiExportPlanner.node_size
+
+            if obj.type == "MESH":
+                vertices, triangles, geometry_size = self.get_mesh_counts(obj, job.settings)
+                estimate.vertices += vertices
+                estimate.triangles += triangles
+                estimate.geometry_size += geometry_size
+
+            if job.settings.get("export_materials", "EXPORT") == "EXPORT":
+                for slot in obj.material_slots:
+                    if slot.material is not None and slot.material not in estimate.materials:
+                        estimate.materials.add(slot.material)
+                        estimate.images |= MSFS_MultiExportPlanner.get_material_images(slot.material)
+
+        estimate.image_size = sum(self.get_image_size(image, job.settings) for image in estimate.images)
+
+        if fingerprint is not None:
+            job.fingerprint = fingerprint.compute(job)
+            estimate.unchanged = self.cache.is_up_to_date(job)
+
+        estimate.duration = self.cache.get(job.file_path).get("duration")
+        return estimate
+
+    def get_throughput(self, estimates):
+        """
+        Bytes written per second by previous exports to the same folders, used for files that were never exported
+        """
+        total_size = 0
+        total_duration = 0.0
+        for estimate in estimates:
+            entry = self.cache.get(estimate.job.file_path)
+            if entry.get("size") and entry.get("duration"):
+                total_size += entry["size"]
+                total_duration += entry["duration"]
+        if total_duration == 0.0:
+            return None
+        return total_size / total_duration
+
+    def plan(self, jobs, skip_unchanged=False):
+        fingerprint = MSFS_ExportFingerprint() if skip_unchanged else None
+        estimates = [self.estimate(job, fingerprint) for job in jobs]
+
+        throughput = self.get_throughput(estimates)
+        if throughput is not None:
+            for estimate in estimates:
+                if estimate.duration is None:
+                    estimate.duration = estimate.size / throughput
+
+        return estimates
+
+
+class MSFS_OT_MultiExportPlan(bpy.types.Operator):
+    bl_idname = "msfs.multi_export_plan"
+    bl_label = "Plan Multi-Export"
+    bl_description = "Estimate the size and export time of every file without exporting anything"
+
+    def execute(self, context):
+        from .msfs_multi_export_jobs import MSFS_MultiExportJobs
+
+        settings = context.scene.msfs_multi_exporter_settings
+        jobs = MSFS_MultiExportJobs.gather(context)
+        estimates = MSFS_MultiExportPlanner(context).plan(
+            jobs, settings.export_skip_unchanged
+        )
+
+        lines = []
+        total_size = 0
+        total_duration = 0.0
+        unknown_duration = False
+        for estimate in estimates:
+            if estimate.unchanged:
+                lines.append(f"{os.path.basename(estimate.job.file_path)}: unchanged, will be skipped")
+                continue
+
+            lines.append(
+                f"{os.path.basename(estimate.job.file_path)}: "
+                f"{estimate.objects} objects, {estimate.vertices} vertices, {estimate.triangles} triangles, "
+                f"{len(estimate.materials)} materials, {len(estimate.images)} images, "
+                f"~{format_size(estimate.size)}, ~{format_duration(estimate.duration)}"
+            )
+            total_size += estimate.size
+            if estimate.duration is None:
+                unknown_duration = True
+            else:
+                total_duration += estimate.duration
+
+        lines.append(
+            f"Total: {len(estimates)} files, ~{format_size(total_size)}, "
+            f"~{format_duration(None if unknown_duration else total_duration)}"
+        )
+
+        for line in lines:
+            print(line)
+            self.report({"INFO"}, line)
+
+        return {"FINISHED"}
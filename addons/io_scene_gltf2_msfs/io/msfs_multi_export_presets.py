@@ -18,6 +18,8 @@ import os
 import bpy
 
 from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+from .msfs_multi_export_planner import MSFS_OT_MultiExportPlan
+from .msfs_multi_export_objects import MultiExporterOverrides
 
 
 class MultiExporterPresetLayer(bpy.types.PropertyGroup):
@@ -48,6 +50,7 @@ class MultiExporterPreset(bpy.types.PropertyGroup):
     enabled: bpy.props.BoolProperty(name="", default=False)
     expanded: bpy.props.BoolProperty(name="", default=True)
     layers: bpy.props.CollectionProperty(type=MultiExporterPresetLayer)
+    overrides: bpy.props.PointerProperty(type=MultiExporterOverrides)
 
 
 class MSFS_OT_AddPreset(bpy.types.Operator):
@@ -180,6 +183,7 @@ class MSFS_PT_MultiExporterPresetsView(bpy.types.Panel):
                 box.prop(preset, "enabled", text="Enabled")
                 box.prop(preset, "name", text="Name")
                 box.prop(preset, "file_path", text="Export Path")
+                preset.overrides.draw(box)
 
                 box.operator(
                     MSFS_OT_EditLayers.bl_idname, text="Edit Layers"
@@ -191,6 +195,7 @@ class MSFS_PT_MultiExporterPresetsView(bpy.types.Panel):
 
         row = layout.row()
         row.operator(MSFS_OT_MultiExportGLTF2.bl_idname, text="Export")
+        row.operator(MSFS_OT_MultiExportPlan.bl_idname, text="Plan")
 
 
 def register():
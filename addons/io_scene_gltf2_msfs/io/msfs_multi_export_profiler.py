@@ -0,0 +1,212 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import bpy
+import json
+import time
+
+from contextlib import ExitStack, contextmanager
+
+from .msfs_multi_export_hooks import patch
+
+
+def get_memory_usage():
+    """
+    Returns (resident set size, peak resident set size) of this process in bytes, or (0, 0) if unknown
+    """
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters),
+            counters.cb,
+        ):
+            return counters.WorkingSetSize, counters.PeakWorkingSetSize
+        return 0, 0
+
+    try:
+        rss = peak = 0
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+        return rss, peak
+    except OSError:
+        pass
+
+    try:
+        import resource
+
+        # macOS reports bytes, the current size isn't available without psutil
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak, peak
+    except ImportError:
+        return 0, 0
+
+
+class MSFS_ExportProfiler:
+    """
+    Records wall time and peak memory of every export phase. Phase times are exclusive, so the time spent in the MSFS
+    hooks or image encoding isn't counted again in the Khronos gather phase that calls them
+    """
+
+    current = None  # The profiler of the export in progress, if any
+
+    def __init__(self):
+        self.item = None
+        self.phases = {}
+        self.stack = []
+
+    def add(self, item, name, duration, peak_memory):
+        phases = self.phases.setdefault(item, {})
+        phase = phases.setdefault(name, {"time": 0.0, "calls": 0, "peak_memory": 0})
+        phase["time"] += duration
+        phase["calls"] += 1
+        phase["peak_memory"] = max(phase["peak_memory"], peak_memory)
+
+    @staticmethod
+    @contextmanager
+    def phase(name):
+        profiler = MSFS_ExportProfiler.current
+        if profiler is None:
+            yield
+            return
+
+        rss_start, peak_start = get_memory_usage()
+        start_time = time.perf_counter()
+        profiler.stack.append(0.0)
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start_time
+            child_duration = profiler.stack.pop()
+            if profiler.stack:
+                profiler.stack[-1] += duration
+
+            # If the process peak rose during the phase, that's the peak of this phase. Otherwise the best we know is
+            # the memory usage at either end
+            rss_end, peak_end = get_memory_usage()
+            peak_memory = peak_end if peak_end > peak_start else max(rss_start, rss_end)
+
+            profiler.add(profiler.item, name, duration - child_duration, peak_memory)
+
+    @staticmethod
+    def wrap(name):
+        def wrap_function(function):
+            def profiled(*args, **kwargs):
+                with MSFS_ExportProfiler.phase(name):
+                    return function(*args, **kwargs)
+
+            return profiled
+
+        return wrap_function
+
+    @contextmanager
+    def activate(self, item):
+        previous = MSFS_ExportProfiler.current
+        MSFS_ExportProfiler.current = self
+        self.item = item
+        try:
+            yield
+        finally:
+            MSFS_ExportProfiler.current = previous
+
+    @contextmanager
+    def active(self, job):
+        with ExitStack() as stack:
+            try:
+                from io_scene_gltf2.blender.exp import gltf2_blender_gather
+                from io_scene_gltf2.blender.exp.gltf2_blender_image import ExportImage
+                from io_scene_gltf2.blender.exp.gltf2_blender_gltf2_exporter import GlTF2Exporter
+                from io_scene_gltf2.io.exp import gltf2_io_export
+
+                stack.enter_context(patch(gltf2_blender_gather, "gather_gltf2", MSFS_ExportProfiler.wrap("khronos_gather")))
+                stack.enter_context(patch(ExportImage, "encode", MSFS_ExportProfiler.wrap("image_encoding")))
+                stack.enter_context(patch(GlTF2Exporter, "finalize_images", MSFS_ExportProfiler.wrap("image_write")))
+                stack.enter_context(patch(GlTF2Exporter, "finalize_buffer", MSFS_ExportProfiler.wrap("file_write")))
+                stack.enter_context(patch(gltf2_io_export, "save_gltf", MSFS_ExportProfiler.wrap("file_write")))
+            except ImportError:
+                pass
+
+            stack.enter_context(self.activate(job.file_path))
+            with MSFS_ExportProfiler.phase("other"):
+                yield
+
+    def finish_job(self, job, result):
+        result.profile = self.phases.pop(job.file_path, {})
+
+    @staticmethod
+    def get_report_path():
+        if bpy.data.filepath:
+            return os.path.splitext(bpy.data.filepath)[0] + ".export_profile.json"
+        return os.path.join(bpy.app.tempdir, "export_profile.json")
+
+    @staticmethod
+    def write_report(profiles, total_time):
+        """
+        Writes a JSON report of the profiles of a run ({file: {phase: data}}) and returns summary lines, slowest phase first
+        """
+        totals = {}
+        for phases in profiles.values():
+            for name, phase in phases.items():
+                total = totals.setdefault(name, {"time": 0.0, "calls": 0, "peak_memory": 0})
+                total["time"] += phase["time"]
+                total["calls"] += phase["calls"]
+                total["peak_memory"] = max(total["peak_memory"], phase["peak_memory"])
+
+        report_path = MSFS_ExportProfiler.get_report_path()
+        with open(report_path, "w") as f:
+            json.dump(
+                {
+                    "blend_file": bpy.data.filepath,
+                    "total_time": total_time,
+                    "phases": totals,
+                    "files": profiles,
+                },
+                f,
+                indent=4,
+            )
+
+        profiled_time = sum(total["time"] for total in totals.values()) or 1.0
+        lines = [f"Export profile written to {report_path}"]
+        for name, total in sorted(totals.items(), key=lambda item: item[1]["time"], reverse=True):
+            lines.append(
+                f"{name}: {total['time']:.2f} s ({total['time'] / profiled_time:.0%}), "
+                f"{total['calls']} calls, peak {total['peak_memory'] / (1024 * 1024):.0f} MB"
+            )
+        return lines
@@ -0,0 +1,388 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import json
+import time
+import shutil
+
+from .msfs_multi_export_jobs import MSFS_MultiExportJobs
+from .msfs_multi_export_cache import MSFS_ExportFingerprint, MSFS_MultiExportCache
+from .msfs_multi_export_worker import MSFS_MultiExportWorkers
+from .msfs_multi_export_textures import MSFS_SharedTextures
+from .msfs_multi_export_profiler import MSFS_ExportProfiler
+from .msfs_multi_export_memory import MSFS_MemoryLimiter
+from .msfs_multi_export_journal import MSFS_MultiExportJournal
+from .msfs_multi_export_staging import MSFS_StagedOutput
+from .msfs_multi_export_instances import MSFS_KeepInstances
+from .msfs_multi_export_flatten import MSFS_FlattenHierarchy
+from .msfs_multi_export_budgets import MSFS_ExportBudgets
+
+
+class MultiExportQueue:
+    """
+    The export plan of one multi-export run, processed one step at a time so it can be driven from a modal operator
+    """
+
+    unsaved_images_warning = (
+        "Images have unsaved changes, which background processes can't export. Exporting in this process instead, "
+        "save the images to export in the background"
+    )
+
+    def __init__(self, context, jobs, resume=False, skip_unchanged=None, parallel=None, journal=True):
+        """
+        skip_unchanged and parallel override the multi-exporter settings when not None. Without a journal, the run
+        can't be resumed and leaves the journal of another run alone
+        """
+        settings = context.scene.msfs_multi_exporter_settings
+        self.start_time = time.perf_counter()
+
+        if skip_unchanged is None:
+            skip_unchanged = settings.export_skip_unchanged
+
+        # Fingerprints are needed by the journal to tell if a file finished by an interrupted run is still up to date,
+        # and to skip unchanged files. They're left out otherwise, as hashing large meshes takes a while
+        if journal or resume or skip_unchanged:
+            fingerprint = MSFS_ExportFingerprint()
+            for job in jobs:
+                job.fingerprint = fingerprint.compute(job)
+
+        self.journal = MSFS_MultiExportJournal() if journal else None
+        self.resumed = []
+        if self.journal is not None:
+            if resume:
+                self.resumed = self.journal.get_finished_jobs(jobs)
+                jobs = [job for job in jobs if job not in self.resumed]
+            self.journal.start(resume)
+
+        self.cache = MSFS_MultiExportCache()
+        self.skipped = []
+        if skip_unchanged:
+            self.skipped = [job for job in jobs if self.cache.is_up_to_date(job)]
+            jobs = [job for job in jobs if job not in self.skipped]
+
+        self.jobs = jobs
+        self.pending = list(jobs)
+        self.results = []
+        self.local_results = []
+        self.cancelled = False
+
+        self.worker_count = min(
+            MSFS_MultiExportWorkers.get_worker_count(settings), len(jobs)
+        )
+        if parallel is None:
+            parallel = settings.export_parallel
+        self.parallel = parallel and self.worker_count > 1
+        self.workers = None
+        self.warnings = []
+
+        self.unsaved_images = MSFS_MultiExportWorkers.has_unsaved_images()
+        if self.parallel and self.unsaved_images:
+            self.parallel = False
+            self.add_warning(MultiExportQueue.unsaved_images_warning)
+        self.temp_dir = None
+
+        self.costs = (
+            MultiExportQueue.estimate_costs(context, self.jobs, self.cache)
+            if self.parallel
+            else None
+        )
+        self.balance_summary = []
+
+        self.options = {
+            "share_textures": settings.export_share_textures,
+            "profile": settings.export_profile,
+            "write_if_changed": settings.export_write_if_changed,
+            "memory_limit": settings.export_memory_limit * 1024 * 1024
+            if settings.export_bounded_memory
+            else 0,
+        }
+        self.hooks = MultiExportQueue.create_hooks(self.options)
+
+        self.profiler = MSFS_ExportProfiler() if self.options["profile"] else None
+        self.xml_files = []
+        self.profile_summary = []
+
+    @staticmethod
+    def estimate_costs(context, jobs, cache):
+        """
+        Relative cost of every job, in seconds if all of them were exported before. Otherwise the estimated output size
+        is used, which mostly depends on triangle counts and image sizes
+        """
+        from .msfs_multi_export_planner import MSFS_MultiExportPlanner
+
+        estimates = MSFS_MultiExportPlanner(context, cache).plan(jobs)
+        if all(estimate.duration is not None for estimate in estimates):
+            return {estimate.job.file_path: estimate.duration for estimate in estimates}
+        return {estimate.job.file_path: float(estimate.size) for estimate in estimates}
+
+    @staticmethod
+    def create_hooks(options):
+        """
+        Hooks active around every job of a run, created from options so workers can set up the same ones
+        """
+        hooks = []
+        memory_limit = options.get("memory_limit")
+        if memory_limit:
+            # First in, last out: frees what the other hooks and the export left behind
+            hooks.append(MSFS_MemoryLimiter(memory_limit))
+        if options.get("share_textures"):
+            hooks.append(
+                MSFS_SharedTextures(memory_limit // 8 if memory_limit else None)
+            )
+        # Only active for jobs of LODs with Keep Instances enabled
+        hooks.append(MSFS_KeepInstances())
+        if options.get("profile"):
+            hooks.append(MSFS_ExportProfiler())
+        # Inside the profiler so merging is profiled, only active for LODs with Flatten on Export enabled
+        hooks.append(MSFS_FlattenHierarchy())
+        if options.get("write_if_changed"):
+            # Inside the profiler, so replacing the changed files is profiled as well
+            hooks.append(MSFS_StagedOutput())
+        # Innermost, so a file that fails its budgets is removed from the staging folder before it's committed
+        hooks.append(MSFS_ExportBudgets())
+        return hooks
+
+    def add_warning(self, warning):
+        print(warning)
+        self.warnings.append(warning)
+
+    @property
+    def memory_exceeded(self):
+        return any(getattr(hook, "exceeded", False) for hook in self.hooks)
+
+    def generate_xml(self, context, group_names=None):
+        """
+        Generates the ModelInfo XML of every LOD group, or only of the named ones, written by finish once the glTF files
+        are exported
+        """
+        from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+
+        if context.scene.msfs_multi_exporter_current_tab != "OBJECTS":
+            return
+
+        for lod_group in context.scene.msfs_multi_exporter_lod_groups:
+            if group_names is not None and lod_group.group_name not in group_names:
+                continue
+            if lod_group.generate_xml:
+                xml_file = MSFS_OT_MultiExportGLTF2.generate_xml(context, lod_group)
+                if xml_file is not None:
+                    self.xml_files.append(xml_file)
+
+    def write_xml(self):
+        from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+
+        only_if_changed = self.options["write_if_changed"]
+        for xml_path, xml_string in self.xml_files:
+            if self.profiler is None:
+                MSFS_OT_MultiExportGLTF2.write_xml(xml_path, xml_string, only_if_changed)
+            else:
+                with self.profiler.activate(os.path.basename(xml_path)):
+                    with MSFS_ExportProfiler.phase("modelinfo_xml"):
+                        MSFS_OT_MultiExportGLTF2.write_xml(
+                            xml_path, xml_string, only_if_changed
+                        )
+
+    def start_workers(self, worker_count):
+        self.workers, self.temp_dir = MSFS_MultiExportWorkers.start(
+            self.pending, worker_count, self.options, self.costs
+        )
+        self.pending = []
+
+    def start(self):
+        if self.parallel:
+            self.start_workers(self.worker_count)
+
+    @property
+    def done(self):
+        if self.workers is not None:
+            return all(
+                worker.poll() is not None
+                and (self.cancelled or not worker.needs_restart)
+                for worker in self.workers
+            )
+        return self.cancelled or not self.pending
+
+    def step(self):
+        if self.workers is not None:
+            if not self.cancelled:
+                MSFS_MultiExportWorkers.restart(self.workers, self.options, self.temp_dir)
+
+            # Workers report after every job, so this is used for progress and the journal
+            self.results = list(self.local_results)
+            for worker in self.workers:
+                self.results.extend(worker.read_results())
+        elif self.pending:
+            self.local_results.extend(
+                MSFS_MultiExportJobs.run([self.pending.pop(0)], self.hooks)
+            )
+            self.results = list(self.local_results)
+
+            # Memory that is still in use after freeing the export data can only be returned by a new process
+            if self.pending and not self.cancelled and self.memory_exceeded:
+                if not self.unsaved_images:
+                    print("Memory limit exceeded, exporting the remaining files in a background process")
+                    self.start_workers(1)
+                elif MultiExportQueue.unsaved_images_warning not in self.warnings:
+                    self.add_warning(MultiExportQueue.unsaved_images_warning)
+
+        self.record_results()
+
+    def record_results(self):
+        if self.journal is None:
+            return
+
+        jobs = {job.file_path: job for job in self.jobs}
+        for result in self.results:
+            if result.success and result.file_path not in self.journal.recorded:
+                self.journal.record(
+                    jobs[result.file_path],
+                    MultiExportQueue.get_output_size(result.file_path),
+                )
+
+    def cancel(self):
+        self.cancelled = True
+        if self.workers is not None:
+            MSFS_MultiExportWorkers.cancel(self.temp_dir)
+
+    def abort(self):
+        """
+        Stops a run that won't be finished, like when the file it exports from is closed. Workers are stopped right
+        away instead of after their current job
+        """
+        self.cancel()
+        if self.workers is not None:
+            for worker in self.workers:
+                worker.terminate()
+            for worker in self.workers:
+                worker.wait()
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.workers = None
+
+    def finish(self):
+        if self.workers is not None:
+            self.results = self.local_results + MSFS_MultiExportWorkers.finish(
+                self.workers, self.temp_dir, self.cancelled
+            )
+        self.record_results()
+
+        if not self.cancelled:
+            self.write_xml()
+
+        if self.workers is not None and len(self.workers) > 1:
+            self.balance_summary = MultiExportQueue.get_balance_summary(self.workers)
+
+        # The journal is only needed to resume a run that didn't complete
+        if self.journal is not None and not self.cancelled and all(result.success for result in self.results):
+            self.journal.remove()
+
+        fingerprints = {job.file_path: job.fingerprint for job in self.jobs}
+        for result in self.results:
+            if not result.success:
+                continue
+
+            self.cache.update(
+                result.file_path,
+                fingerprint=fingerprints[result.file_path],
+                duration=result.duration,
+                size=MultiExportQueue.get_output_size(result.file_path),
+            )
+        self.cache.save()
+
+        if self.profiler is not None:
+            profiles = dict(self.profiler.phases)
+            for result in self.results:
+                if result.profile:
+                    profiles[result.file_path] = result.profile
+            self.profile_summary = MSFS_ExportProfiler.write_report(
+                profiles, time.perf_counter() - self.start_time
+            )
+
+        return self.results
+
+    @staticmethod
+    def get_balance_summary(workers):
+        """
+        Summary lines of how evenly the export time was spread across the workers
+        """
+        busy_times = [sum(result.duration for result in worker.results) for worker in workers]
+        longest = max(busy_times)
+        average = sum(busy_times) / len(busy_times)
+
+        lines = [
+            f"Worker balance: {len(workers)} workers, busiest {longest:.1f} s, least busy {min(busy_times):.1f} s, "
+            f"{average / longest if longest > 0 else 1.0:.0%} average utilization"
+        ]
+        for worker, busy_time in zip(workers, busy_times):
+            lines.append(f"Worker {worker.index}: {len(worker.results)} files, {busy_time:.1f} s")
+        return lines
+
+    @staticmethod
+    def get_output_size(file_path):
+        """
+        Size of a glTF file with its buffers and images on disk
+        """
+        try:
+            with open(file_path, "r") as f:
+                gltf = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        folder = os.path.dirname(file_path)
+        paths = {file_path}
+        for item in gltf.get("buffers", []) + gltf.get("images", []):
+            if "uri" in item:
+                paths.add(os.path.join(folder, item["uri"]))
+
+        return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+    def get_progress(self):
+        """
+        Returns a list of (group name, exported files, total files) in export order
+        """
+        finished = {result.file_path for result in self.results}
+
+        progress = {}
+        for job in self.jobs:
+            done, total = progress.get(job.group_name, (0, 0))
+            progress[job.group_name] = (
+                done + (job.file_path in finished),
+                total + 1,
+            )
+        return [(name, done, total) for name, (done, total) in progress.items()]
+
+    def get_eta(self):
+        """
+        Estimates the remaining time in seconds from the durations of previous exports of the same files
+        """
+        finished = {result.file_path for result in self.results}
+        remaining = [job for job in self.jobs if job.file_path not in finished]
+        if not remaining:
+            return 0.0
+
+        durations = [result.duration for result in self.results]
+        average = sum(durations) / len(durations) if durations else None
+
+        eta = 0.0
+        for job in remaining:
+            duration = self.cache.get(job.file_path).get("duration", average)
+            if duration is None:
+                return None
+            eta += duration
+
+        if self.parallel:
+            eta /= self.worker_count
+        return eta
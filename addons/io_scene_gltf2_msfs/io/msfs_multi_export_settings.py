@@ -236,6 +236,80 @@ class MSFS_MultiExporterSettings(bpy.types.PropertyGroup):
         default=False,
     )
 
+    export_skip_unchanged: bpy.props.BoolProperty(
+        name="Skip Unchanged",
+        description="Only export files whose objects, materials, images or export settings changed since the last export",
+        default=False,
+    )
+
+    export_share_textures: bpy.props.BoolProperty(
+        name="Share Textures",
+        description="Encode and write each image once per multi-export instead of once per exported file. "
+        "Relies on internals of the glTF exporter, and falls back to writing every image if they changed",
+        default=False,
+    )
+
+    export_profile: bpy.props.BoolProperty(
+        name="Profile",
+        description="Record the time and peak memory of every export phase and write a JSON report next to the .blend file",
+        default=False,
+    )
+
+    export_write_if_changed: bpy.props.BoolProperty(
+        name="Write If Changed",
+        description="Export to a temporary folder first and only replace the files whose contents changed, so "
+        "unchanged files keep their modification time and aren't rebuilt by the package builder",
+        default=False,
+    )
+
+    export_parallel: bpy.props.BoolProperty(
+        name="Parallel Export",
+        description="Export LODs in background Blender processes running side by side. "
+        "Each process opens a copy of the current file",
+        default=False,
+    )
+
+    export_worker_count: bpy.props.IntProperty(
+        name="Workers",
+        description="Number of background Blender processes to use. 0 uses one per physical core, or half the logical "
+        "cores if psutil isn't installed",
+        default=0,
+        min=0,
+        max=256,
+    )
+
+    export_bounded_memory: bpy.props.BoolProperty(
+        name="Bounded Memory",
+        description="Free the temporary data of every export before the next one, and continue in a fresh background "
+        "Blender process when memory use stays above the limit",
+        default=False,
+    )
+
+    export_memory_limit: bpy.props.IntProperty(
+        name="Memory Limit",
+        description="Memory use in MB above which the remaining files are exported by a fresh process",
+        default=8192,
+        min=256,
+        subtype="UNSIGNED",
+    )
+
+    export_watch: bpy.props.BoolProperty(
+        name="Watch for Changes",
+        description="Export the LODs and presets affected by an edit again a moment after the last change, and when the "
+        "file is saved. Only files whose contents changed are exported",
+        default=False,
+    )
+
+    export_watch_delay: bpy.props.FloatProperty(
+        name="Delay",
+        description="Time without changes to wait for before exporting",
+        default=0.3,
+        min=0.05,
+        max=10.0,
+        subtype="TIME",
+        unit="TIME",
+    )
+
 
 class MSFS_PT_export_main(bpy.types.Panel):
     bl_space_type = "VIEW_3D"
@@ -436,6 +510,42 @@ class MSFS_PT_export_animation_skinning(bpy.types.Panel):
         layout.prop(settings, "export_all_influences")
 
 
+class MSFS_PT_export_performance(bpy.types.Panel):
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_label = "Performance"
+    bl_parent_id = "MSFS_PT_MultiExporter"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene.msfs_multi_exporter_current_tab == "SETTINGS"
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+        layout.use_property_decorate = False  # No animation.
+
+        settings = context.scene.msfs_multi_exporter_settings
+
+        layout.prop(settings, "export_skip_unchanged")
+        layout.prop(settings, "export_share_textures")
+        layout.prop(settings, "export_write_if_changed")
+        layout.prop(settings, "export_parallel")
+        col = layout.column()
+        col.active = settings.export_parallel
+        col.prop(settings, "export_worker_count")
+        layout.prop(settings, "export_bounded_memory")
+        col = layout.column()
+        col.active = settings.export_bounded_memory
+        col.prop(settings, "export_memory_limit")
+        layout.prop(settings, "export_profile")
+        layout.prop(settings, "export_watch")
+        col = layout.column()
+        col.active = settings.export_watch
+        col.prop(settings, "export_watch_delay")
+
+
 def register():
     bpy.types.Scene.msfs_multi_exporter_settings = bpy.props.PointerProperty(
         type=MSFS_MultiExporterSettings
@@ -0,0 +1,113 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import filecmp
+import tempfile
+
+from contextlib import contextmanager
+
+from .msfs_multi_export_profiler import MSFS_ExportProfiler
+
+
+class MSFS_StagedOutput:
+    """
+    Exports into a staging folder that mirrors the output folders, then only replaces the output files whose contents
+    changed. Unchanged files keep their modification time, so the package builder doesn't rebuild their models
+    """
+
+    current = None  # The staged output of the export in progress, if any
+
+    def __init__(self):
+        self.staging_dir = None
+        self.roots = {}  # Drive -> folder mirroring it in the staging folder
+        self.changed = 0
+        self.unchanged = 0
+
+    @staticmethod
+    def get_export_path(file_path):
+        staged_output = MSFS_StagedOutput.current
+        if staged_output is None:
+            return file_path
+        return staged_output.get_staged_path(file_path)
+
+    def get_staged_path(self, path):
+        drive, path = os.path.splitdrive(os.path.abspath(path))
+        root = self.roots.setdefault(drive, f"root{len(self.roots)}")
+        return os.path.join(self.staging_dir, root, path.lstrip("\\/"))
+
+    def get_target_path(self, staged_path):
+        root, path = os.path.relpath(staged_path, self.staging_dir).split(os.sep, 1)
+        drive = next(drive for drive, name in self.roots.items() if name == root)
+        return drive + os.sep + path
+
+    @staticmethod
+    def replace(source_path, target_path):
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        try:
+            os.replace(source_path, target_path)
+        except OSError:
+            # The staging folder is on another drive, copy next to the target first so the replace stays atomic
+            temp_path = target_path + ".tmp"
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, target_path)
+
+    @staticmethod
+    def write_if_changed(path, data):
+        """
+        Writes bytes to a file unless it already has the same contents. Returns whether the file was written
+        """
+        try:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+        except OSError:
+            pass
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return True
+
+    def commit(self):
+        for folder, _, file_names in os.walk(self.staging_dir):
+            for file_name in file_names:
+                staged_path = os.path.join(folder, file_name)
+                target_path = self.get_target_path(staged_path)
+
+                if os.path.isfile(target_path) and filecmp.cmp(staged_path, target_path, shallow=False):
+                    self.unchanged += 1
+                else:
+                    MSFS_StagedOutput.replace(staged_path, target_path)
+                    self.changed += 1
+
+    @contextmanager
+    def active(self, job):
+        previous = MSFS_StagedOutput.current
+        MSFS_StagedOutput.current = self
+        self.staging_dir = tempfile.mkdtemp(prefix="msfs_multi_export_staging_")
+        self.roots = {}
+        self.changed = self.unchanged = 0
+        try:
+            yield
+            with MSFS_ExportProfiler.phase("file_write"):
+                self.commit()
+            print(f"{job.file_path}: replaced {self.changed} changed files, kept {self.unchanged} unchanged files")
+        finally:
+            MSFS_StagedOutput.current = previous
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
@@ -0,0 +1,134 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import hashlib
+
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from .msfs_multi_export_hooks import patch
+from .msfs_multi_export_staging import MSFS_StagedOutput
+
+
+class MSFS_SharedTextures:
+    """
+    Shares encoded images between all the glTF files of a multi-export batch. Each LOD is a separate Khronos export,
+    so without this the same textures are encoded and written again for every LOD that uses them
+    """
+
+    # Upper bound of encoded image data kept in memory, least recently used images are encoded again if evicted.
+    # With a memory limit, the queue passes a share of the limit instead
+    max_cache_size = 256 * 1024 * 1024
+
+    def __init__(self, max_cache_size=None):
+        self.encoded = OrderedDict()
+        self.cache_size = 0
+        self.written = {}  # Final path -> digest of the images written by this batch
+        self.warned = False
+        if max_cache_size is not None:
+            self.max_cache_size = max_cache_size
+
+    @staticmethod
+    def get_size(path):
+        # A file that's missing or was replaced since, like one a failed budget check kept from being committed
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def get_key(export_image, mime_type):
+        fills = []
+        for channel, fill in export_image.fills.items():
+            image = getattr(fill, "image", None)
+            if image is not None:
+                fills.append((int(channel), image.name, getattr(image.library, "name", ""), int(fill.src_chan)))
+            else:
+                fills.append((int(channel), repr(getattr(fill, "value", None))))
+        return (mime_type, tuple(sorted(fills)))
+
+    def wrap_encode(self, encode):
+        def shared_encode(export_image, mime_type, *args, **kwargs):
+            key = MSFS_SharedTextures.get_key(export_image, mime_type)
+            if key in self.encoded:
+                self.encoded.move_to_end(key)
+                return self.encoded[key]
+
+            data = encode(export_image, mime_type, *args, **kwargs)
+
+            self.encoded[key] = data
+            self.cache_size += len(data)
+            while self.cache_size > self.max_cache_size and len(self.encoded) > 1:
+                _, evicted = self.encoded.popitem(last=False)
+                self.cache_size -= len(evicted)
+
+            return data
+
+        return shared_encode
+
+    def wrap_finalize_images(self, finalize_images):
+        def shared_finalize_images(exporter, *args, **kwargs):
+            images = getattr(exporter, "_GlTF2Exporter__images", None)
+            export_settings = getattr(exporter, "_GlTF2Exporter__export_settings", None)
+            if images is None or export_settings is None:
+                # A Khronos exporter whose internals changed, images are written by every export as usual
+                if not self.warned:
+                    print("Share Textures isn't supported by this version of the glTF exporter, writing every image")
+                    self.warned = True
+                return finalize_images(exporter, *args, **kwargs)
+
+            # Leave out images that an earlier export of this batch already wrote to the same file. Files are keyed by
+            # their final path, as staged output writes every export to its own staging folder
+            output_path = export_settings["gltf_texturedirectory"]
+            staged_output = MSFS_StagedOutput.current
+            pending = {}
+            skipped = {}
+            for name, image in images.items():
+                dst_path = os.path.normpath(output_path + "/" + name + image.file_extension)
+                if staged_output is not None:
+                    dst_path = staged_output.get_target_path(dst_path)
+                digest = hashlib.sha1(image.data).hexdigest()
+                if self.written.get(dst_path) == digest and MSFS_SharedTextures.get_size(dst_path) == len(image.data):
+                    skipped[name] = image
+                else:
+                    pending[dst_path] = digest
+
+            for name in skipped:
+                del images[name]
+            try:
+                result = finalize_images(exporter, *args, **kwargs)
+            finally:
+                images.update(skipped)
+
+            self.written.update(pending)
+            return result
+
+        return shared_finalize_images
+
+    @contextmanager
+    def active(self, job=None):
+        try:
+            from io_scene_gltf2.blender.exp.gltf2_blender_image import ExportImage
+            from io_scene_gltf2.blender.exp.gltf2_blender_gltf2_exporter import GlTF2Exporter
+        except ImportError:
+            yield
+            return
+
+        with ExitStack() as stack:
+            stack.enter_context(patch(ExportImage, "encode", self.wrap_encode))
+            stack.enter_context(patch(GlTF2Exporter, "finalize_images", self.wrap_finalize_images))
+            yield
@@ -0,0 +1,244 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import bpy
+import time
+import traceback
+
+from bpy.app.handlers import persistent
+
+from .msfs_multi_export_jobs import MSFS_MultiExportJobs
+from .msfs_multi_export_queue import MultiExportQueue
+
+
+class MSFS_ExportWatcher:
+    """
+    Exports the files affected by edits again while Watch for Changes is enabled. Depsgraph updates only record what
+    changed, the export starts from a timer once nothing changed for the watch delay, so dragging an object doesn't
+    export on every update. Jobs are exported in this process, one per timer call, as starting a background Blender
+    would take longer than exporting the few files an edit usually touches
+    """
+
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    # Data whose changes are traced to the objects using it
+    data_types = (
+        bpy.types.Mesh,
+        bpy.types.Curve,
+        bpy.types.Material,
+        bpy.types.Light,
+        bpy.types.Camera,
+        bpy.types.Armature,
+    )
+    # Data that can be used in too many ways to trace, so every file is checked for changes
+    shared_types = (bpy.types.Image, bpy.types.NodeTree, bpy.types.Action)
+
+    changed_objects = set()  # Names of the objects that changed since the last export
+    changed_data = set()  # Names of the meshes, materials and other data that changed since the last export
+    changed_all = False
+    deadline = None  # When to export, if anything changed
+    queue = None  # The MultiExportQueue of the export in progress, if any
+    exporting = False  # Set while a job is exported, so the changes it makes aren't recorded
+
+    @staticmethod
+    def is_enabled(scene):
+        return scene.msfs_exporter_properties.enabled and scene.msfs_multi_exporter_settings.export_watch
+
+    @staticmethod
+    def reset():
+        MSFS_ExportWatcher.changed_objects = set()
+        MSFS_ExportWatcher.changed_data = set()
+        MSFS_ExportWatcher.changed_all = False
+        MSFS_ExportWatcher.deadline = None
+        MSFS_ExportWatcher.queue = None
+        MSFS_ExportWatcher.exporting = False
+
+    @staticmethod
+    def schedule(scene):
+        delay = scene.msfs_multi_exporter_settings.export_watch_delay
+        MSFS_ExportWatcher.deadline = time.perf_counter() + delay
+        if not bpy.app.timers.is_registered(MSFS_ExportWatcher.tick):
+            bpy.app.timers.register(MSFS_ExportWatcher.tick, first_interval=delay)
+
+    @staticmethod
+    def record_updates(scene, depsgraph):
+        changed = False
+        for update in depsgraph.updates:
+            id = update.id.original
+            if isinstance(id, bpy.types.Object):
+                # Selection changes update objects too, without changing anything that's exported
+                if update.is_updated_transform or update.is_updated_geometry:
+                    MSFS_ExportWatcher.changed_objects.add(id.name)
+                    changed = True
+            elif isinstance(id, MSFS_ExportWatcher.data_types):
+                MSFS_ExportWatcher.changed_data.add(id.name)
+                changed = True
+            elif isinstance(id, MSFS_ExportWatcher.shared_types):
+                MSFS_ExportWatcher.changed_all = True
+                changed = True
+
+        if changed:
+            MSFS_ExportWatcher.schedule(scene)
+
+    @staticmethod
+    def is_affected(job):
+        for name in job.objects:
+            if name in MSFS_ExportWatcher.changed_objects:
+                return True
+
+            obj = bpy.data.objects.get(name)
+            if obj is None:
+                continue
+            if obj.data is not None and obj.data.name in MSFS_ExportWatcher.changed_data:
+                return True
+            for slot in obj.material_slots:
+                if slot.material is not None and slot.material.name in MSFS_ExportWatcher.changed_data:
+                    return True
+        return False
+
+    @staticmethod
+    def start(context):
+        jobs = MSFS_MultiExportJobs.gather(context)
+        if not MSFS_ExportWatcher.changed_all:
+            jobs = [job for job in jobs if MSFS_ExportWatcher.is_affected(job)]
+
+        MSFS_ExportWatcher.changed_objects = set()
+        MSFS_ExportWatcher.changed_data = set()
+        MSFS_ExportWatcher.changed_all = False
+        MSFS_ExportWatcher.deadline = None
+        if not jobs:
+            return
+
+        # Fingerprints filter out the jobs whose files wouldn't change, like the ones a save marks as changed
+        # Without a journal, so the Resume state of an interrupted multi-export is kept
+        queue = MultiExportQueue(context, jobs, skip_unchanged=True, parallel=False, journal=False)
+        if queue.jobs:
+            queue.generate_xml(context, {job.group_name for job in queue.jobs})
+        queue.start()
+        MSFS_ExportWatcher.queue = queue
+
+    @staticmethod
+    def step():
+        queue = MSFS_ExportWatcher.queue
+
+        MSFS_ExportWatcher.exporting = True
+        try:
+            queue.step()
+        except Exception:
+            traceback.print_exc()
+            queue.cancel()
+        finally:
+            MSFS_ExportWatcher.exporting = False
+
+        if not queue.done:
+            return
+
+        MSFS_ExportWatcher.queue = None
+        MSFS_ExportWatcher.exporting = True
+        try:
+            results = queue.finish()
+        finally:
+            MSFS_ExportWatcher.exporting = False
+
+        for result in results:
+            if result.success:
+                print(f"Watch: exported {result.file_path} in {result.duration:.2f} s")
+            else:
+                print(f"Watch: failed to export {result.file_path}: {result.error}")
+            for warning in result.warnings:
+                print(f"Watch: {result.file_path}: {warning}")
+
+    @staticmethod
+    def tick():
+        from .msfs_multi_export import MSFS_OT_MultiExportGLTF2
+
+        if MSFS_ExportWatcher.queue is not None:
+            MSFS_ExportWatcher.step()
+            if MSFS_ExportWatcher.queue is not None:
+                # Past the memory limit the rest is exported by a background process, which only needs polling
+                if MSFS_ExportWatcher.queue.workers is not None:
+                    return 0.1
+                # Come back right away, the UI still gets to handle events between jobs
+                return 0.0
+
+        # Changes made during the export wait for their own delay
+        if MSFS_ExportWatcher.deadline is None:
+            return None
+
+        remaining = MSFS_ExportWatcher.deadline - time.perf_counter()
+        if remaining > 0:
+            return remaining
+
+        # Don't export the same files as a multi-export in progress, those already include the changes
+        if MSFS_OT_MultiExportGLTF2.queue is not None:
+            return 0.5
+
+        context = bpy.context
+        if not MSFS_ExportWatcher.is_enabled(context.scene):
+            MSFS_ExportWatcher.reset()
+            return None
+
+        MSFS_ExportWatcher.start(context)
+        return 0.0 if MSFS_ExportWatcher.queue is not None else None
+
+
+@persistent
+def watch_depsgraph_update(scene, depsgraph):
+    if MSFS_ExportWatcher.exporting or not MSFS_ExportWatcher.is_enabled(scene):
+        return
+    MSFS_ExportWatcher.record_updates(scene, depsgraph)
+
+
+@persistent
+def watch_save(*args):
+    scene = bpy.context.scene
+    if scene is None or not MSFS_ExportWatcher.is_enabled(scene):
+        return
+
+    # Not every edit shows up as a depsgraph update, so a save checks every file for changes
+    MSFS_ExportWatcher.changed_all = True
+    MSFS_ExportWatcher.schedule(scene)
+
+
+@persistent
+def watch_load(*args):
+    # Names and the export in progress belong to the file that was open before
+    if bpy.app.timers.is_registered(MSFS_ExportWatcher.tick):
+        bpy.app.timers.unregister(MSFS_ExportWatcher.tick)
+    if MSFS_ExportWatcher.queue is not None:
+        MSFS_ExportWatcher.queue.abort()
+    MSFS_ExportWatcher.reset()
+
+
+handlers = (
+    (bpy.app.handlers.depsgraph_update_post, watch_depsgraph_update),
+    (bpy.app.handlers.save_post, watch_save),
+    (bpy.app.handlers.load_pre, watch_load),
+)
+
+
+def register():
+    for handler_list, handler in handlers:
+        if handler not in handler_list:
+            handler_list.append(handler)
+
+
+def unregister():
+    for handler_list, handler in handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
+    watch_load()
@@ -0,0 +1,255 @@
+# glTF-Blender-IO-MSFS
+# Copyright (C) 2022 The glTF-Blender-IO-MSFS authors
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import bpy
+import json
+import heapq
+import shutil
+import tempfile
+import subprocess
+
+from .msfs_multi_export_jobs import (
+    MultiExportJob,
+    MultiExportResult,
+    MSFS_MultiExportJobs,
+)
+
+# Exit code of a worker that stopped early because it went over the memory limit, its remaining jobs go to a new worker
+MEMORY_LIMIT_EXIT_CODE = 3
+
+
+class MultiExportWorker:
+    """
+    A background Blender process exporting its share of the jobs from a snapshot of the current .blend
+    """
+
+    def __init__(self, index, jobs, options, snapshot_path, temp_dir):
+        self.index = index
+        self.jobs = jobs
+        self.snapshot_path = snapshot_path
+        self.replaced = False
+        self.results = []  # Set by MSFS_MultiExportWorkers.finish
+        self.job_path = os.path.join(temp_dir, f"worker_{index}_jobs.json")
+        self.result_path = os.path.join(temp_dir, f"worker_{index}_results.json")
+        self.log_path = os.path.join(temp_dir, f"worker_{index}.log")
+
+        with open(self.job_path, "w") as f:
+            json.dump({"jobs": [job.to_dict() for job in jobs], "options": options}, f)
+
+        with open(self.log_path, "w") as log:
+            self.process = subprocess.Popen(
+                [
+                    bpy.app.binary_path,
+                    "--background",
+                    snapshot_path,
+                    "--python-expr",
+                    f"import importlib; importlib.import_module({__name__!r}).main()",
+                    "--",
+                    self.job_path,
+                    self.result_path,
+                ],
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+
+    def poll(self):
+        return self.process.poll()
+
+    def wait(self):
+        return self.process.wait()
+
+    def terminate(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+
+    def read_results(self):
+        if not os.path.exists(self.result_path):
+            return []
+
+        with open(self.result_path, "r") as f:
+            return [MultiExportResult.from_dict(data) for data in json.load(f)]
+
+    @property
+    def needs_restart(self):
+        return self.process.poll() == MEMORY_LIMIT_EXIT_CODE and not self.replaced
+
+    def get_remaining_jobs(self):
+        finished = {result.file_path for result in self.read_results()}
+        return [job for job in self.jobs if job.file_path not in finished]
+
+    def collect(self):
+        results = {result.file_path: result for result in self.read_results()}
+        if self.replaced:
+            return list(results.values())
+
+        # Any job the worker didn't report on was lost when the process exited
+        for job in self.jobs:
+            if job.file_path not in results:
+                results[job.file_path] = MultiExportResult(
+                    job.file_path,
+                    success=False,
+                    error=f"Worker {self.index} exited with code {self.process.returncode} (see {self.log_path})",
+                )
+
+        return [results[job.file_path] for job in self.jobs]
+
+
+class MSFS_MultiExportWorkers:
+    def __new__(cls, *args, **kwargs):
+        raise RuntimeError("%s should not be instantiated" % cls)
+
+    @staticmethod
+    def get_worker_count(settings):
+        if settings.export_worker_count > 0:
+            return settings.export_worker_count
+
+        try:
+            import psutil
+
+            count = psutil.cpu_count(logical=False)
+        except ImportError:
+            count = None
+        if count:
+            return count
+
+        # psutil isn't bundled with Blender, and os.cpu_count() counts logical cores, which is usually two per core
+        return max((os.cpu_count() or 1) // 2, 1)
+
+    @staticmethod
+    def has_unsaved_images():
+        # Edits to images are only saved in the snapshot once the images are saved or packed
+        return any(image.is_dirty for image in bpy.data.images)
+
+    @staticmethod
+    def split_jobs(jobs, worker_count, costs=None):
+        """
+        Splits jobs between workers. With estimated costs, the most expensive jobs are handed out first, each to the
+        worker with the least work so far, so a large job doesn't start last and keep the other workers waiting
+        """
+        if costs is None:
+            return [jobs[i::worker_count] for i in range(worker_count) if jobs[i::worker_count]]
+
+        worker_jobs = [[] for _ in range(worker_count)]
+        loads = [(0.0, i) for i in range(worker_count)]
+        for job in sorted(jobs, key=lambda job: costs.get(job.file_path, 0.0), reverse=True):
+            load, i = heapq.heappop(loads)
+            worker_jobs[i].append(job)
+            heapq.heappush(loads, (load + costs.get(job.file_path, 0.0), i))
+        return [assigned for assigned in worker_jobs if assigned]
+
+    @staticmethod
+    def start(jobs, worker_count, options, costs=None):
+        temp_dir = tempfile.mkdtemp(prefix="msfs_multi_export_")
+
+        # Workers open a copy of the current state of the file, so unsaved changes are exported as well. Except for
+        # changes to images, the queue exports in this process if there are any
+        snapshot_path = os.path.join(temp_dir, "snapshot.blend")
+        bpy.ops.wm.save_as_mainfile(
+            filepath=snapshot_path, copy=True, check_existing=False
+        )
+
+        workers = [
+            MultiExportWorker(i, worker_jobs, options, snapshot_path, temp_dir)
+            for i, worker_jobs in enumerate(
+                MSFS_MultiExportWorkers.split_jobs(jobs, worker_count, costs)
+            )
+        ]
+        return workers, temp_dir
+
+    @staticmethod
+    def restart(workers, options, temp_dir):
+        """
+        Hands the remaining jobs of workers that stopped at the memory limit to fresh workers
+        """
+        for worker in list(workers):
+            if worker.needs_restart:
+                worker.replaced = True
+                remaining_jobs = worker.get_remaining_jobs()
+                if remaining_jobs:
+                    workers.append(
+                        MultiExportWorker(
+                            len(workers), remaining_jobs, options, worker.snapshot_path, temp_dir
+                        )
+                    )
+
+    @staticmethod
+    def cancel(temp_dir):
+        # Workers check for this file between jobs, so the job that is running gets to finish
+        open(os.path.join(temp_dir, "cancel"), "w").close()
+
+    @staticmethod
+    def finish(workers, temp_dir, cancelled=False):
+        results = []
+        for worker in workers:
+            worker.results = worker.read_results() if cancelled else worker.collect()
+            results.extend(worker.results)
+
+        # The worker logs are kept if something failed, the snapshot is a copy of the whole file so it never is
+        if all(result.success for result in results):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        else:
+            try:
+                os.remove(os.path.join(temp_dir, "snapshot.blend"))
+            except OSError:
+                pass
+
+        return results
+
+
+def enable_addon():
+    # Background processes need the MSFS extensions to be active for the glTF exporter hooks to run
+    import addon_utils
+
+    addon_name = __package__.split(".")[0]
+    if not addon_utils.check(addon_name)[1]:
+        addon_utils.enable(addon_name, default_set=False)
+
+
+def main():
+    """
+    Entry point of a background worker, called as
+    blender --background snapshot.blend --python-expr "..." -- jobs.json results.json
+    """
+    job_path, result_path = sys.argv[sys.argv.index("--") + 1 :][:2]
+
+    enable_addon()
+
+    from .msfs_multi_export_queue import MultiExportQueue
+
+    with open(job_path, "r") as f:
+        data = json.load(f)
+    jobs = [MultiExportJob.from_dict(job_data) for job_data in data["jobs"]]
+    hooks = MultiExportQueue.create_hooks(data["options"])
+
+    cancel_path = os.path.join(os.path.dirname(job_path), "cancel")
+
+    results = []
+    for i, job in enumerate(jobs):
+        if os.path.exists(cancel_path):
+            break
+
+        results.extend(MSFS_MultiExportJobs.run([job], hooks))
+
+        # Write results after every job so a crash only loses the job that was running, and the
+        # parent can show progress. The rename makes sure it never reads a partially written file
+        with open(result_path + ".tmp", "w") as f:
+            json.dump([result.to_dict() for result in results], f)
+        os.replace(result_path + ".tmp", result_path)
+
+        if i + 1 < len(jobs) and any(getattr(hook, "exceeded", False) for hook in hooks):
+            sys.exit(MEMORY_LIMIT_EXIT_CODE)